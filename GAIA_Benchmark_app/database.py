@@ -0,0 +1,357 @@
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+from psycopg2 import extensions
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Load database configuration from environment variables
+db_host = os.getenv("DB_HOST")
+db_port = os.getenv("DB_PORT")
+db_name = os.getenv("DB_NAME")
+db_user = os.getenv("DB_USER")
+db_password = os.getenv("DB_PASSWORD")
+
+# Pool limits: open connections at most, seconds an idle connection is kept, seconds to wait for a free one
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", 30))
+
+# Connections idle for longer than this are checked with a SELECT 1 before they are handed out
+DB_POOL_HEALTH_CHECK_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", 30))
+
+# Query cache: seconds a result stays fresh and the memory the cached DataFrames may take in total
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", 600))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Channel the ingest pipeline and the app NOTIFY on after writing; the payload is the table name
+DATA_CHANGED_CHANNEL = os.getenv("DATA_CHANGED_CHANNEL", "gaia_data_changed")
+
+# Errors after which a connection is considered broken and thrown away
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections shared by every session of the app.
+
+    At most `max_size` connections are open at once; callers wait up to `acquire_timeout` seconds for one
+    to be returned. Connections idle for longer than `idle_timeout` are closed, connections idle for longer
+    than `health_check_seconds` are pinged before reuse, and broken connections are replaced.
+    """
+
+    def __init__(self, max_size=DB_POOL_MAX_SIZE, idle_timeout=DB_POOL_IDLE_TIMEOUT,
+                 acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT, health_check_seconds=DB_POOL_HEALTH_CHECK_SECONDS,
+                 **connect_kwargs):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_check_seconds = health_check_seconds
+        self.connect_kwargs = connect_kwargs
+        self.idle = []  # (connection, time it was returned), most recently returned last
+        self.open_connections = 0
+        self.condition = threading.Condition()
+
+    # Function to open a new connection
+    def connect(self):
+        return psycopg2.connect(**self.connect_kwargs)
+
+    # Function to tell whether an idle connection can be handed out again
+    def is_healthy(self, conn, idle_seconds):
+        if conn.closed:
+            return False
+        if idle_seconds < self.health_check_seconds:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    # Function to close a connection that leaves the pool
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.condition:
+            self.open_connections -= 1
+            self.condition.notify()
+
+    # Function to close idle connections past the idle timeout (the caller holds the lock)
+    def prune_idle(self):
+        now = time.monotonic()
+        expired = [conn for conn, returned in self.idle if now - returned > self.idle_timeout]
+        self.idle = [(conn, returned) for conn, returned in self.idle if now - returned <= self.idle_timeout]
+        for conn in expired:
+            conn.close()
+            self.open_connections -= 1
+        if expired:
+            self.condition.notify_all()
+
+    # Function to take a connection from the pool, opening one when there is room
+    def getconn(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self.condition:
+                self.prune_idle()
+                while not self.idle and self.open_connections >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"no database connection available within {self.acquire_timeout:.0f}s")
+                    self.condition.wait(remaining)
+                    self.prune_idle()
+                if self.idle:
+                    conn, returned = self.idle.pop()
+                else:
+                    conn, returned = None, None
+                    self.open_connections += 1
+
+            # Connect and health-check outside the lock so other sessions are not held up
+            if conn is None:
+                try:
+                    return self.connect()
+                except Exception:
+                    with self.condition:
+                        self.open_connections -= 1
+                        self.condition.notify()
+                    raise
+            if self.is_healthy(conn, time.monotonic() - returned):
+                return conn
+            self.discard(conn)
+
+    # Function to give a connection back; broken connections and ones left mid-transaction are cleaned up
+    def putconn(self, conn, broken=False):
+        if not broken and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except CONNECTION_ERRORS:
+                broken = True
+        if broken or conn.closed:
+            self.discard(conn)
+            return
+        with self.condition:
+            self.idle.append((conn, time.monotonic()))
+            self.condition.notify()
+
+    # Function to close every idle connection
+    def closeall(self):
+        with self.condition:
+            for conn, _ in self.idle:
+                conn.close()
+                self.open_connections -= 1
+            self.idle = []
+
+    # Context manager lending a connection: commits on success, rolls back on error, and throws the
+    # connection away when the error shows it is broken
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.putconn(conn, broken=broken)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Function to return the process-wide connection pool, creating it on first use
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                dbname=db_name,
+                user=db_user,
+                password=db_password,
+                host=db_host,
+                port=db_port,
+                connect_timeout=10,
+                keepalives=1,
+                keepalives_idle=60
+            )
+        return _pool
+
+# Function to borrow a pooled connection (use as `with connection() as conn:`)
+def connection():
+    return get_pool().connection()
+
+# Function to run a read query into a DataFrame; a query that fails because its connection broke is
+# retried once on a fresh connection
+def query_df(query, params=None):
+    for attempt in range(2):
+        try:
+            with connection() as conn:
+                return pd.read_sql_query(query, conn, params=params)
+        except CONNECTION_ERRORS:
+            if attempt == 1:
+                raise
+
+# Function to run a statement and commit it; returns the number of affected rows.
+# Tables listed in changed_tables are announced on the change channel in the same transaction, and this
+# process's cached results for them are dropped once the transaction has committed.
+# Writes are not retried, since a connection error at commit time does not say whether they were applied.
+def execute(query, params=None, changed_tables=()):
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            for table_name in changed_tables:
+                notify_table_changed(cursor, table_name)
+            rowcount = cursor.rowcount
+    if changed_tables and _query_cache is not None:
+        _query_cache.invalidate(changed_tables)
+    return rowcount
+
+
+class QueryCache:
+    """Query results shared by every session, with a TTL and least-recently-used eviction by size.
+
+    Each entry is tagged with the tables it reads, so a change notification for a table drops exactly the
+    entries built from it. Every invalidation also bumps a generation counter per table; a result is only
+    stored if the generations of its tables are unchanged since its query started, so a result read before
+    a change but finished after it is never cached. Cached DataFrames are handed out as shallow copies and
+    must not be modified in place.
+    """
+
+    def __init__(self, ttl=QUERY_CACHE_TTL, max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (DataFrame, tables, size, expiry)
+        self.generations = {}  # table -> number of invalidations of that table
+        self.generation_all = 0  # number of invalidations of every table
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Function to return a fresh cached result (None on a miss)
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[3] < time.monotonic():
+                if entry is not None:
+                    self.remove(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    # Function to snapshot the generations of the given tables (taken before running a query)
+    def generation(self, tables):
+        with self.lock:
+            return self.generation_all, tuple(self.generations.get(table, 0) for table in tables)
+
+    # Function to store a result, evicting the least recently used entries beyond the size budget.
+    # With a generation snapshot, the result is dropped if one of its tables changed since the snapshot.
+    def put(self, key, df, tables, ttl=None, generation=None):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if generation is not None and generation != (
+                self.generation_all, tuple(self.generations.get(table, 0) for table in tables)
+            ):
+                return
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (df, frozenset(tables), size, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                self.remove(next(iter(self.entries)))
+
+    # Function to drop one entry (the caller holds the lock)
+    def remove(self, key):
+        _, _, size, _ = self.entries.pop(key)
+        self.total_bytes -= size
+
+    # Function to drop every entry that reads one of the given tables (all entries when tables is empty)
+    def invalidate(self, tables=()):
+        tables = set(tables)
+        with self.lock:
+            if tables:
+                for table in tables:
+                    self.generations[table] = self.generations.get(table, 0) + 1
+            else:
+                self.generation_all += 1
+            for key in [key for key, entry in self.entries.items() if not tables or entry[1] & tables]:
+                self.remove(key)
+
+
+# Function to listen for change notifications and invalidate the cache; runs on a daemon thread and
+# reconnects after failures (while it is down, the TTL still bounds how stale a result can get)
+def listen_for_changes(cache, channel=DATA_CHANGED_CHANNEL):
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(**get_pool().connect_kwargs)
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {channel};")
+            # Anything may have changed while the listener was not connected
+            cache.invalidate()
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    cache.invalidate([notify.payload] if notify.payload else [])
+        except Exception as e:
+            print(f"Query cache listener disconnected: {e}")
+        finally:
+            if conn is not None and not conn.closed:
+                conn.close()
+        time.sleep(5)
+
+_query_cache = None
+_query_cache_lock = threading.Lock()
+
+# Function to return the process-wide query cache, starting its change listener on first use
+def get_query_cache():
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            _query_cache = QueryCache()
+            threading.Thread(target=listen_for_changes, args=(_query_cache,), daemon=True).start()
+        return _query_cache
+
+# Function to run a read query through the shared cache; `tables` names the tables the query reads,
+# so the result is dropped when one of them changes
+def cached_query_df(query, params=None, tables=(), ttl=None):
+    cache = get_query_cache()
+    key = (query, tuple(params) if params is not None else None)
+    df = cache.get(key)
+    if df is None:
+        generation = cache.generation(tables)
+        df = query_df(query, params)
+        cache.put(key, df, tables, ttl=ttl, generation=generation)
+    return df.copy(deep=False)
+
+# Function to signal that a table changed: the NOTIFY reaches every app process, this one included, when the
+# surrounding transaction commits (execute also drops this process's cached results right after the commit)
+def notify_table_changed(cursor, table_name):
+    cursor.execute("SELECT pg_notify(%s, %s);", (DATA_CHANGED_CHANNEL, table_name))
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
 from openai import OpenAI
-import psycopg2
 import os
 from dotenv import load_dotenv
+from database import cached_query_df, execute
+from results_table import create_results_table
 
 # Load environment variables from .env file
 load_dotenv()
@@ -11,104 +12,49 @@ load_dotenv()
 # Load OpenAI API key from environment variables
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
-# Load database configuration from environment variables
-db_host = os.getenv("DB_HOST")
-db_port = os.getenv("DB_PORT")
-db_name = os.getenv("DB_NAME")
-db_user = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-
 # Check if the API key is successfully loaded
 if not openai_api_key:
     st.error("OpenAI API key not found. Please set the API key in the .env file.")
 else:
     client = OpenAI(api_key=openai_api_key)
 
-# Function to connect to the Cloud SQL PostgreSQL instance using psycopg2
-def connect_to_db():
+# Model used to answer the questions, recorded with every result
+OPENAI_MODEL = "gpt-4o-mini"
+
+# Create the table once per server process rather than on every rerun of the page
+@st.cache_resource
+def ensure_results_table():
+    create_results_table()
+
+ensure_results_table()
+
+# Function to insert result into gaia_benchmark_results table, keyed by the task it answers
+def insert_result(task_id, question, expected_answer, generated_response, result, model=OPENAI_MODEL):
+    insert_query = """
+    INSERT INTO gaia_benchmark_results (task_id, question, expected_answer, generated_response, result, model)
+    VALUES (%s, %s, %s, %s, %s, %s);
+    """
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        return conn
+        # Convert numpy types to native Python types if necessary
+        task_id = str(task_id) if not isinstance(task_id, str) else task_id
+        question = str(question) if not isinstance(question, str) else question
+        expected_answer = str(expected_answer) if not isinstance(expected_answer, str) else expected_answer
+        generated_response = str(generated_response) if not isinstance(generated_response, str) else generated_response
+        result = str(result) if not isinstance(result, str) else result
+
+        execute(insert_query, (task_id, question, expected_answer, generated_response, result, model), changed_tables=("gaia_benchmark_results",))
+        st.session_state.result_recorded = True  # Set flag to indicate that a result has been recorded
+        print("Data inserted successfully into 'gaia_benchmark_results'.")
     except Exception as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
-
-# Function to create gaia_benchmark_results table if it doesn't exist
-def create_results_table():
-    conn = connect_to_db()
-    if conn:
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS gaia_benchmark_results (
-            id SERIAL PRIMARY KEY,
-            question TEXT NOT NULL,
-            expected_answer TEXT NOT NULL,
-            generated_response TEXT NOT NULL,
-            result TEXT
-        );
-        """
-        try:
-            with conn.cursor() as cur:
-                cur.execute(create_table_query)
-                conn.commit()
-                print("Table 'gaia_benchmark_results' created or already exists.")
-        except Exception as e:
-            print(f"Error creating table gaia_benchmark_results: {e}")
-        finally:
-            conn.close()
-            print("Database connection closed after table creation.")
-    else:
-        print("Failed to connect to the database for table creation.")
-
-create_results_table()
-
-# Function to insert result into gaia_benchmark_results table without number
-def insert_result(question, expected_answer, generated_response, result):
-    conn = connect_to_db()
-    if conn:
-        insert_query = """
-        INSERT INTO gaia_benchmark_results (question, expected_answer, generated_response, result)
-        VALUES (%s, %s, %s, %s);
-        """
-        try:
-            # Convert numpy types to native Python types if necessary
-            question = str(question) if not isinstance(question, str) else question
-            expected_answer = str(expected_answer) if not isinstance(expected_answer, str) else expected_answer
-            generated_response = str(generated_response) if not isinstance(generated_response, str) else generated_response
-            result = str(result) if not isinstance(result, str) else result
-            
-            with conn.cursor() as cur:
-                cur.execute(insert_query, (question, expected_answer, generated_response, result))
-                conn.commit()
-                st.session_state.result_recorded = True  # Set flag to indicate that a result has been recorded
-                print("Data inserted successfully into 'gaia_benchmark_results'.")
-        except Exception as e:
-            st.error(f"Error inserting data: {e}")
-        finally:
-            conn.close()
-            print("Database connection closed after data insertion.")
-    else:
-        st.error("Failed to connect to the database.")
+        st.error(f"Error inserting data: {e}")
 
 # Function to load validation data into a Pandas DataFrame
 def load_validation_data():
-    conn = connect_to_db()
-    if conn:
-        query = "SELECT * FROM validation;"  # Adjust your query as needed
-        try:
-            df = pd.read_sql_query(query, conn)
-            conn.close()  # Close the connection after loading data
-            return df
-        except Exception as e:
-            st.error(f"Error loading data: {e}")
-            conn.close()  # Close the connection on error
-    else:
-        st.warning("Failed to connect to the database for loading validation data.")
+    query = "SELECT * FROM validation;"  # Adjust your query as needed
+    try:
+        return cached_query_df(query, tables=("validation",))
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
     return None
 
 # Function to get the answer from OpenAI API using the chat format
@@ -116,7 +62,7 @@ def get_openai_chat_response(messages):
     try:
         # Create the chat completion
         completion = client.chat.completions.create(
-            model="gpt-4o-mini",  # Replace with your desired model (e.g., gpt-3.5-turbo, gpt-4)
+            model=OPENAI_MODEL,  # Replace with your desired model (e.g., gpt-3.5-turbo, gpt-4)
             messages=messages
         )
         # Access the response content
@@ -206,6 +152,7 @@ def show():
 
         # Filter the selected question's data
         question_data = filtered_data[filtered_data['question'] == selected_question].iloc[0]
+        task_id = question_data['task_id']
         question = question_data['question']
         expected_answer = question_data['final_answer']  # Use final_answer as the expected answer
 
@@ -252,7 +199,7 @@ def show():
                 if not st.session_state.show_metadata:
                     if st.button("Record Response as 'ASIS' 📝"):
                         # Insert the result with "ASIS"
-                        insert_result(question, expected_answer, st.session_state.openai_response, "ASIS")
+                        insert_result(task_id, question, expected_answer, st.session_state.openai_response, "ASIS")
                         st.success("Response recorded as 'ASIS'.")
 
                 # Show the button to ask with Chain of Thought if not already showing metadata
@@ -291,11 +238,11 @@ def show():
                 # Show "With Instructions" and "Unable to Answer" buttons
                 col1, col2 = st.columns(2)
                 if col1.button("Record as 'With Instructions' ✅"):
-                    insert_result(question, expected_answer, st.session_state.cot_response, "With Instructions")
+                    insert_result(task_id, question, expected_answer, st.session_state.cot_response, "With Instructions")
                     st.success("Response recorded as 'With Instructions'.")
 
                 if col2.button("Record as 'Unable to Answer' ❌"):
-                    insert_result(question, expected_answer, st.session_state.cot_response, "Unable to Answer")
+                    insert_result(task_id, question, expected_answer, st.session_state.cot_response, "Unable to Answer")
                     st.success("Response recorded as 'Unable to Answer'.")
         else:
             # Message to indicate result has been recorded
@@ -1,68 +1,115 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
-import os
-from dotenv import load_dotenv
 import plotly.express as px
 import plotly.graph_objects as go
+from database import cached_query_df
+from results_table import COUNTS_TABLE, RESULTS_TABLE, create_results_table
+
+PAGE_SIZES = [25, 50, 100]
+
+# Create the results table and its rollup once per server process, so the page works before any result is recorded
+@st.cache_resource
+def ensure_results_table():
+    create_results_table()
+
+ensure_results_table()
+
+# Function to load the number of responses per result type, level and model from the rollup.
+# The rollup holds one row per question, result and model, so this does not grow with the responses recorded.
+def load_result_counts():
+    query = f"""
+    SELECT counts.result, COALESCE(CAST(task.level AS TEXT), 'unknown') AS level, counts.model,
+           CAST(SUM(counts.responses) AS BIGINT) AS responses
+    FROM {COUNTS_TABLE} AS counts
+    LEFT JOIN validation AS task ON task.task_id = counts.task_id
+    WHERE counts.responses > 0
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3;
+    """
+    try:
+        return cached_query_df(query, tables=(RESULTS_TABLE, "validation"))
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+    return None
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Load database configuration from environment variables
-db_host = os.getenv("DB_HOST")
-db_port = os.getenv("DB_PORT")
-db_name = os.getenv("DB_NAME")
-db_user = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-
-# Function to connect to the Cloud SQL PostgreSQL instance using psycopg2
-def connect_to_db():
+# Function to count the distinct questions (by text) that have at least one response
+def count_questions():
+    query = f"SELECT COUNT(DISTINCT question_key) AS questions FROM {COUNTS_TABLE} WHERE responses > 0;"
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        return conn
+        return int(cached_query_df(query, tables=(RESULTS_TABLE,))['questions'][0])
     except Exception as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
-
-# Function to load the data from gaia_benchmark_results into a Pandas DataFrame
-def load_results_data():
-    conn = connect_to_db()
-    if conn:
-        query = "SELECT * FROM gaia_benchmark_results;"
-        try:
-            df = pd.read_sql_query(query, conn)
-            conn.close()  # Close the connection after loading data
-            return df
-        except Exception as e:
-            st.error(f"Error loading data: {e}")
-            conn.close()  # Close the connection on error
+        st.error(f"Error counting questions: {e}")
     return None
 
+# Function to load one page of recorded responses, newest first, starting before the id of the previous
+# page's last row. One extra row is fetched to tell whether there is a next page.
+def load_results_page(before_id, page_size):
+    where, params = "", []
+    if before_id is not None:
+        where, params = " WHERE id < %s", [before_id]
+    query = f"""
+    SELECT id, task_id, model, result, question, expected_answer, generated_response
+    FROM {RESULTS_TABLE}{where} ORDER BY id DESC LIMIT {page_size + 1};
+    """
+    try:
+        page = cached_query_df(query, params, tables=(RESULTS_TABLE,))
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return None, False
+    return page.head(page_size), len(page) > page_size
+
+# Function to page through the recorded responses; nothing is loaded until the user asks for it
+def show_results_pages():
+    st.subheader("Benchmark Results Data")
+    if not st.checkbox("Show recorded responses"):
+        return
+
+    page_size = st.selectbox("Responses per page:", PAGE_SIZES)
+    if st.session_state.get('results_page_size') != page_size:
+        st.session_state.results_page_size = page_size
+        st.session_state.results_page_ids = [None]  # id to start before, for every page visited so far
+
+    page, has_next = load_results_page(st.session_state.results_page_ids[-1], page_size)
+    if page is None:
+        return
+    st.write(f"Page {len(st.session_state.results_page_ids)}")
+    st.dataframe(page, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    if col1.button("⬅️ Previous page", disabled=len(st.session_state.results_page_ids) == 1):
+        st.session_state.results_page_ids.pop()
+        st.rerun()
+    if col2.button("Next page ➡️", disabled=not has_next):
+        st.session_state.results_page_ids.append(page['id'].tolist()[-1])
+        st.rerun()
+
+# Function to draw the responses of each result type across the values of a column (level or model)
+def show_breakdown(counts, column, title):
+    breakdown = counts.groupby([column, 'result'], as_index=False)['responses'].sum()
+    fig = px.bar(breakdown, x=column, y='responses', color='result',
+                 labels={'responses': 'Number of Responses', column: column.capitalize(), 'result': 'Result Type'},
+                 title=title)
+    fig.update_layout(height=400, width=700, barmode='stack')
+    st.plotly_chart(fig)
+
 # Function to display the metrics data in the tab
 def show():
     st.set_page_config(page_title="GAIA Benchmark LLM Validation Metrics", layout="wide")
     st.title("GAIA Benchmark LLM Validation Metrics")
 
-    # Load and display the data
-    df = load_results_data()
+    # Load the aggregated counts; the raw responses are only loaded on request, a page at a time
+    counts = load_result_counts()
 
-    if df is not None:
-        st.subheader("Benchmark Results Data")
-        st.dataframe(df)  # Display the dataframe in Streamlit
+    if counts is not None and not counts.empty:
+        show_results_pages()
 
         # Display the total number of questions and responses
-        total_questions = df['question'].nunique()
-        total_responses = len(df)
-        asis_count = len(df[df['result'] == 'ASIS'])
-        with_instructions_count = len(df[df['result'] == 'With Instructions'])
-        unable_to_answer_count = len(df[df['result'] == 'Unable to Answer'])
+        result_totals = counts.groupby('result')['responses'].sum()
+        total_questions = count_questions()
+        total_responses = int(result_totals.sum())
+        asis_count = int(result_totals.get('ASIS', 0))
+        with_instructions_count = int(result_totals.get('With Instructions', 0))
+        unable_to_answer_count = int(result_totals.get('Unable to Answer', 0))
 
         st.subheader("Summary Statistics")
         st.write(f"**Total Questions Asked:** {total_questions}")
@@ -72,7 +119,7 @@ def show():
         st.write(f"**Responses Recorded as 'Unable to Answer':** {unable_to_answer_count}")
 
         # Display the count of results by type using a horizontal bar chart
-        result_counts = df['result'].value_counts().reset_index()
+        result_counts = result_totals.sort_values(ascending=False).reset_index()
         result_counts.columns = ['Result Type', 'Count']
         st.subheader("Result Type Counts")
 
@@ -130,6 +177,12 @@ def show():
             st.write(f"- Count: {row['Count']}")
             st.write(f"- Percentage: {row['Percentage']:.2f}%")
 
+        # Display the result types by question level and by model
+        st.subheader("Results by Level")
+        show_breakdown(counts, 'level', 'Result Types by Question Level')
+        st.subheader("Results by Model")
+        show_breakdown(counts, 'model', 'Result Types by Model')
+
     else:
         st.write("No data available in gaia_benchmark_results.")
 
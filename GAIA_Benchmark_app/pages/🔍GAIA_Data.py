@@ -1,50 +1,94 @@
 import streamlit as st
-import os
 import pandas as pd
-import psycopg2
-from psycopg2 import sql
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Load database configuration from environment variables
-db_host = os.getenv("DB_HOST")
-db_port = os.getenv("DB_PORT")
-db_name = os.getenv("DB_NAME")
-db_user = os.getenv("DB_USER")
-db_password = os.getenv("DB_PASSWORD")
-
-# Function to connect to the Cloud SQL PostgreSQL instance using psycopg2
-def connect_to_db():
+from database import cached_query_df
+
+# Table browsed by this page and the unique column used for keyset pagination
+TABLE_NAME = "validation"
+KEY_COLUMN = "task_id"
+
+# Large text columns: left out of the grid by default and never offered as filters
+LARGE_COLUMNS = ["question", "final_answer", "annotator_metadata", "source_text", "extraction_error"]
+
+# Most distinct values offered in a filter dropdown
+MAX_FILTER_VALUES = 1000
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Function to quote a column name that was checked against the table's columns
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+# Function to load the column names of the validation table
+def load_columns():
+    query = """
+    SELECT column_name FROM information_schema.columns
+    WHERE table_name = %s AND table_schema = current_schema()
+    ORDER BY ordinal_position;
+    """
     try:
-        conn = psycopg2.connect(
-            dbname=db_name,
-            user=db_user,
-            password=db_password,
-            host=db_host,
-            port=db_port
-        )
-        return conn
+        return cached_query_df(query, (TABLE_NAME,), tables=(TABLE_NAME,))['column_name'].tolist()
     except Exception as e:
-        st.error(f"Error connecting to database: {e}")
-        return None
+        st.error(f"Error loading columns: {e}")
+    return []
+
+# Function to build the WHERE clause and parameters of the selected filter
+def filter_clause(filter_column, filter_value):
+    if filter_column is None:
+        return "", []
+    if filter_value is None:
+        return f" WHERE {quote_identifier(filter_column)} IS NULL", []
+    return f" WHERE {quote_identifier(filter_column)} = %s", [filter_value]
 
-# Function to load data into a Pandas DataFrame using psycopg2
-def load_data():
-    conn = connect_to_db()
-    if conn:
-        query = "SELECT * FROM validation;"
-        try:
-            # Use pandas to execute the query and read data into a DataFrame
-            df = pd.read_sql_query(query, conn)
-            conn.close()  # Close the connection after loading data
-            return df
-        except Exception as e:
-            st.error(f"Error loading data: {e}")
-            conn.close()  # Close the connection on error
+# Function to load the distinct values of a column, computed by the database
+def load_distinct_values(column):
+    query = f"SELECT DISTINCT {quote_identifier(column)} AS value FROM {TABLE_NAME} ORDER BY 1 LIMIT {MAX_FILTER_VALUES};"
+    try:
+        return cached_query_df(query, tables=(TABLE_NAME,))['value'].tolist()
+    except Exception as e:
+        st.error(f"Error loading filter values: {e}")
+    return []
+
+# Function to count the rows matching the filter
+def count_rows(filter_column, filter_value):
+    where, params = filter_clause(filter_column, filter_value)
+    try:
+        return int(cached_query_df(f"SELECT COUNT(*) AS count FROM {TABLE_NAME}{where};", params, tables=(TABLE_NAME,))['count'][0])
+    except Exception as e:
+        st.error(f"Error counting rows: {e}")
     return None
 
+# Function to load one page of the selected columns, starting after the key of the previous page's last row.
+# One extra row is fetched to tell whether there is a next page.
+def load_page(columns, filter_column, filter_value, after_key, page_size):
+    where, params = filter_clause(filter_column, filter_value)
+    if after_key is not None:
+        where += (" AND " if where else " WHERE ") + f"{quote_identifier(KEY_COLUMN)} > %s"
+        params.append(after_key)
+    projection = ", ".join(quote_identifier(column) for column in [KEY_COLUMN] + [c for c in columns if c != KEY_COLUMN])
+    query = f"SELECT {projection} FROM {TABLE_NAME}{where} ORDER BY {quote_identifier(KEY_COLUMN)} LIMIT {page_size + 1};"
+    try:
+        page = cached_query_df(query, params, tables=(TABLE_NAME,))
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return None, False
+    return page.head(page_size), len(page) > page_size
+
+# Function to load the source text of a single row
+def load_source_text(task_id):
+    query = f"SELECT source_text FROM {TABLE_NAME} WHERE {quote_identifier(KEY_COLUMN)} = %s;"
+    try:
+        rows = cached_query_df(query, (task_id,), tables=(TABLE_NAME,))
+    except Exception as e:
+        st.error(f"Error loading source text: {e}")
+        return None
+    return rows['source_text'][0] if len(rows) else None
+
+# Function to go back to the first page whenever the projection, filter or page size changes
+def reset_pagination_on_change(signature):
+    if st.session_state.get('browse_signature') != signature:
+        st.session_state.browse_signature = signature
+        st.session_state.page_keys = [None]  # key to start after, for every page visited so far
+
 # Function to display the Validation Data tab
 def show():
     # Set up the Streamlit page configuration
@@ -56,31 +100,66 @@ def show():
     # Page Subheader with description
     st.subheader("View and Explore Validation Data")
     st.write("""
-    Welcome to the Validation Data Viewer! This page provides an interactive platform to view and explore the validation data stored in the database. 
+    Welcome to the Validation Data Viewer! This page provides an interactive platform to view and explore the validation data stored in the database.
     Use the options below to filter and analyze the dataset.
     """)
 
-    # Load and display data
-    data = load_data()
-    if data is not None:
-        st.write("### Data Overview")
-        st.write("Explore the complete dataset below. You can scroll, sort, and filter the data as needed.")
-        st.dataframe(data)
-
-        # Optional: Add a filter for a specific column
-        st.write("### Filter Data by Column")
-        column = st.selectbox("Select a column to filter by:", data.columns)
-        unique_values = data[column].unique()
-        selected_value = st.selectbox(f"Filter by {column}:", unique_values)
-        filtered_data = data[data[column] == selected_value]
+    all_columns = load_columns()
+    if KEY_COLUMN not in all_columns:
+        st.warning("No data available to display. Please check the database connection or data availability.")
+        return
 
-        st.write(f"### Filtered Data by {column}: {selected_value}")
-        st.write("Here is the data filtered by your selected value.")
-        st.dataframe(filtered_data)
+    # Choose the columns to display; large text columns are only loaded when asked for
+    default_columns = [column for column in all_columns if column not in LARGE_COLUMNS]
+    columns = st.multiselect("Columns to display:", all_columns, default=default_columns)
 
+    # Filter by the value of a column; the distinct values come from the database
+    st.write("### Filter Data by Column")
+    filter_columns = ["(no filter)"] + [column for column in all_columns if column not in LARGE_COLUMNS]
+    filter_column = st.selectbox("Select a column to filter by:", filter_columns)
+    filter_value = None
+    if filter_column == "(no filter)":
+        filter_column = None
     else:
-        st.warning("No data available to display. Please check the database connection or data availability.")
+        values = load_distinct_values(filter_column)
+        if len(values) == MAX_FILTER_VALUES:
+            st.caption(f"Showing the first {MAX_FILTER_VALUES} values.")
+        filter_value = st.selectbox(f"Filter by {filter_column}:", values)
+
+    page_size = st.selectbox("Rows per page:", PAGE_SIZES)
+    reset_pagination_on_change((tuple(columns), filter_column, filter_value, page_size))
+
+    # Load and display the current page
+    page_number = len(st.session_state.page_keys)
+    page, has_next = load_page(columns, filter_column, filter_value, st.session_state.page_keys[-1], page_size)
+    if page is None:
+        return
+
+    total = count_rows(filter_column, filter_value)
+    st.write("### Data Overview")
+    if total is not None:
+        st.write(f"Page {page_number} of {max(1, -(-total // page_size))} ({total} rows).")
+    st.dataframe(page, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    if col1.button("⬅️ Previous page", disabled=page_number == 1):
+        st.session_state.page_keys.pop()
+        st.rerun()
+    if col2.button("Next page ➡️", disabled=not has_next):
+        st.session_state.page_keys.append(page[KEY_COLUMN].tolist()[-1])
+        st.rerun()
+
+    # Source text is fetched for one row at a time, only when requested
+    if "source_text" in all_columns and not page.empty:
+        st.write("### Source Text")
+        task_id = st.selectbox("Select a row to view its extracted source text:", page[KEY_COLUMN].tolist())
+        if st.button("Show source text 📄"):
+            source_text = load_source_text(task_id)
+            if pd.notna(source_text):
+                st.markdown(f"```\n{source_text}\n```")
+            else:
+                st.info("This row has no source text.")
 
 # Call the show function to display in the Streamlit app
 if __name__ == "__main__":
-    show()
\ No newline at end of file
+    show()
@@ -0,0 +1,114 @@
+from psycopg2 import sql
+from database import connection, execute
+
+# Table the validation tool records its results in
+RESULTS_TABLE = "gaia_benchmark_results"
+
+# Rollup of the results kept up to date by a trigger: responses per (question, task, result, model).
+# Questions are keyed by a hash of their text, so a question counts once whether or not its results are linked
+# to a task; task_id ('' when unlinked) is kept so the level can be joined from validation when the rollup is read.
+# Its size depends on the questions and models, not on the number of responses recorded.
+COUNTS_TABLE = "gaia_benchmark_result_counts"
+
+# Stored in the rollup for a missing result or model
+UNKNOWN = "unknown"
+
+ROLLUP_IDENTIFIERS = {
+    "results": sql.Identifier(RESULTS_TABLE),
+    "counts": sql.Identifier(COUNTS_TABLE),
+    "apply_function": sql.Identifier(f"{RESULTS_TABLE}_rollup_apply"),
+    "trigger_function": sql.Identifier(f"{RESULTS_TABLE}_rollup"),
+    "trigger": sql.Identifier(f"{RESULTS_TABLE}_rollup_trigger"),
+    "unknown": sql.Literal(UNKNOWN),
+}
+
+# Function to create gaia_benchmark_results table if it doesn't exist, with the rollup the Metrics page reads.
+# Results reference validation.task_id; the foreign key itself is added by data_handle/schema_migration.py,
+# which the metadata load runs, since validation may not be keyed yet when the app starts.
+def create_results_table():
+    create_table_query = """
+    CREATE TABLE IF NOT EXISTS gaia_benchmark_results (
+        id SERIAL PRIMARY KEY,
+        task_id VARCHAR(255),
+        question TEXT NOT NULL,
+        expected_answer TEXT NOT NULL,
+        generated_response TEXT NOT NULL,
+        result TEXT,
+        model VARCHAR(64)
+    );
+    ALTER TABLE gaia_benchmark_results ADD COLUMN IF NOT EXISTS task_id VARCHAR(255);
+    ALTER TABLE gaia_benchmark_results ADD COLUMN IF NOT EXISTS model VARCHAR(64);
+    CREATE INDEX IF NOT EXISTS gaia_benchmark_results_task_id_result_idx ON gaia_benchmark_results (task_id, result);
+    """
+    try:
+        execute(create_table_query)
+        print("Table 'gaia_benchmark_results' created or already exists.")
+        install_result_rollup()
+    except Exception as e:
+        print(f"Error creating table gaia_benchmark_results: {e}")
+
+# Function to tell whether the rollup table and its trigger are both in place
+def rollup_installed(cursor):
+    cursor.execute(
+        "SELECT to_regclass(%s) IS NOT NULL AND EXISTS (SELECT 1 FROM pg_trigger WHERE tgrelid = to_regclass(%s) AND tgname = %s);",
+        (COUNTS_TABLE, RESULTS_TABLE, f"{RESULTS_TABLE}_rollup_trigger")
+    )
+    return cursor.fetchone()[0]
+
+# Function to install the rollup table and the trigger that maintains it on every insert, update and delete
+# of a result. The rollup is only built from the existing results when it is installed; from then on the
+# trigger keeps it current, so an app that finds it in place does nothing.
+def install_result_rollup():
+    with connection() as conn:
+        with conn.cursor() as cursor:
+            if rollup_installed(cursor):
+                return
+
+            # Block writes to the results (and other installers) so no result is missed or counted twice
+            cursor.execute(sql.SQL("LOCK TABLE {results} IN SHARE ROW EXCLUSIVE MODE;").format(**ROLLUP_IDENTIFIERS))
+            if rollup_installed(cursor):
+                return
+
+            cursor.execute(sql.SQL("""
+                CREATE TABLE IF NOT EXISTS {counts} (
+                    question_key TEXT NOT NULL,
+                    task_id VARCHAR(255) NOT NULL DEFAULT '',
+                    result TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    responses BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (question_key, task_id, result, model)
+                );
+
+                CREATE OR REPLACE FUNCTION {apply_function}(result_task_id TEXT, result_question TEXT, result_value TEXT,
+                                                            result_model TEXT, delta INTEGER) RETURNS void AS $$
+                BEGIN
+                    INSERT INTO {counts} AS counts (question_key, task_id, result, model, responses)
+                    VALUES (md5(result_question), COALESCE(result_task_id, ''),
+                            COALESCE(result_value, {unknown}), COALESCE(result_model, {unknown}), delta)
+                    ON CONFLICT (question_key, task_id, result, model) DO UPDATE SET responses = counts.responses + EXCLUDED.responses;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE OR REPLACE FUNCTION {trigger_function}() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        PERFORM {apply_function}(OLD.task_id, OLD.question, OLD.result, OLD.model, -1);
+                    END IF;
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        PERFORM {apply_function}(NEW.task_id, NEW.question, NEW.result, NEW.model, 1);
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER {trigger}
+                AFTER INSERT OR UPDATE OR DELETE ON {results}
+                FOR EACH ROW EXECUTE FUNCTION {trigger_function}();
+
+                DELETE FROM {counts};
+                INSERT INTO {counts} (question_key, task_id, result, model, responses)
+                SELECT md5(question), COALESCE(task_id, ''), COALESCE(result, {unknown}), COALESCE(model, {unknown}), COUNT(*)
+                FROM {results}
+                GROUP BY 1, 2, 3, 4;
+            """).format(**ROLLUP_IDENTIFIERS))
+    print(f"Rollup '{COUNTS_TABLE}' installed and built from '{RESULTS_TABLE}'.")
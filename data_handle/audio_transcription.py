@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+from pydub import AudioSegment
+from pydub.silence import detect_nonsilent
+
+# Recognizer backend used by default ("google", "sphinx" or "stub", or any registered name)
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "google")
+
+# Number of segments transcribed concurrently
+TRANSCRIPTION_WORKERS = int(os.getenv("TRANSCRIPTION_WORKERS", 4))
+
+# Silence detection: a pause of at least MIN_SILENCE_MS quieter than SILENCE_THRESHOLD_DB below the
+# average loudness splits the recording; segments are merged up to MAX_SEGMENT_MS and longer speech is cut
+MIN_SILENCE_MS = int(os.getenv("TRANSCRIPTION_MIN_SILENCE_MS", 700))
+SILENCE_THRESHOLD_DB = int(os.getenv("TRANSCRIPTION_SILENCE_THRESHOLD_DB", 16))
+MAX_SEGMENT_MS = int(os.getenv("TRANSCRIPTION_MAX_SEGMENT_MS", 50_000))
+KEEP_SILENCE_MS = 200
+
+
+class Recognizer:
+    """Interface of a speech recognition backend.
+
+    `transcribe(audio_data)` receives a speech_recognition.AudioData for one segment and returns its text,
+    or an empty string when nothing could be recognised. Request failures should raise sr.RequestError.
+    """
+
+    name = "base"
+
+    def transcribe(self, audio_data):
+        raise NotImplementedError
+
+
+class GoogleRecognizer(Recognizer):
+    """Google Web Speech API (online)."""
+
+    name = "Google Speech Recognition"
+
+    def transcribe(self, audio_data):
+        try:
+            return sr.Recognizer().recognize_google(audio_data)
+        except sr.UnknownValueError:
+            return ""
+
+
+class SphinxRecognizer(Recognizer):
+    """CMU Sphinx (offline, requires pocketsphinx)."""
+
+    name = "Sphinx"
+
+    def transcribe(self, audio_data):
+        try:
+            return sr.Recognizer().recognize_sphinx(audio_data)
+        except sr.UnknownValueError:
+            return ""
+
+
+class StubRecognizer(Recognizer):
+    """Local stand-in for tests and benchmarks: returns a fixed text for every segment."""
+
+    name = "Stub recognizer"
+
+    def __init__(self, text=None):
+        self.text = os.getenv("TRANSCRIPTION_STUB_TEXT", "[speech]") if text is None else text
+
+    def transcribe(self, audio_data):
+        return self.text
+
+
+# Registry of recognizer backends by name
+recognizers = {
+    "google": GoogleRecognizer,
+    "sphinx": SphinxRecognizer,
+    "stub": StubRecognizer,
+}
+
+# Function to register an additional recognizer backend
+def register_recognizer(name, recognizer_class):
+    recognizers[name] = recognizer_class
+
+# Function to create the recognizer for a backend name (TRANSCRIPTION_BACKEND by default)
+def get_recognizer(name=None):
+    name = name or TRANSCRIPTION_BACKEND
+    if name not in recognizers:
+        raise ValueError(f"Unknown transcription backend '{name}'. Available: {', '.join(sorted(recognizers))}")
+    return recognizers[name]()
+
+# Function to split decoded audio on silence into segments of at most MAX_SEGMENT_MS
+def split_audio_on_silence(audio, min_silence_ms=MIN_SILENCE_MS, max_segment_ms=MAX_SEGMENT_MS):
+    silence_threshold = audio.dBFS - SILENCE_THRESHOLD_DB
+    speech_ranges = detect_nonsilent(audio, min_silence_len=min_silence_ms, silence_thresh=silence_threshold, seek_step=10)
+    if not speech_ranges:
+        return []
+
+    # Pad each range, merge neighbours while the merged segment stays short enough, and cut long ranges
+    ranges = []
+    for start, end in speech_ranges:
+        start = max(0, start - KEEP_SILENCE_MS)
+        end = min(len(audio), end + KEEP_SILENCE_MS)
+        if ranges and end - ranges[-1][0] <= max_segment_ms:
+            ranges[-1] = (ranges[-1][0], end)
+            continue
+        while end - start > max_segment_ms:
+            ranges.append((start, start + max_segment_ms))
+            start += max_segment_ms
+        ranges.append((start, end))
+    return [audio[start:end] for start, end in ranges]
+
+# Function to convert a segment to recognizer input in memory (mono 16-bit PCM, no temp WAV)
+def segment_to_audio_data(segment):
+    segment = segment.set_channels(1).set_sample_width(2)
+    return sr.AudioData(segment.raw_data, segment.frame_rate, segment.sample_width)
+
+# Function to transcribe an audio file: decode it in memory, split it on silence, transcribe the segments
+# concurrently and stitch the text back together in order
+def transcribe_audio(file_path, recognizer=None, workers=TRANSCRIPTION_WORKERS):
+    if recognizer is None:
+        recognizer = get_recognizer()
+
+    audio = AudioSegment.from_file(file_path)
+    segments = split_audio_on_silence(audio)
+    if not segments:
+        return ""
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        texts = list(executor.map(lambda segment: recognizer.transcribe(segment_to_audio_data(segment)), segments))
+    return " ".join(text.strip() for text in texts if text and text.strip())
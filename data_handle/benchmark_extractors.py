@@ -0,0 +1,388 @@
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import struct
+import sys
+import time
+import tracemalloc
+import wave
+import zipfile
+
+# The benchmark runs offline: speech goes to the stub recognizer and no extractor plugins are loaded
+os.environ["TRANSCRIPTION_BACKEND"] = "stub"
+os.environ["EXTRACTOR_PLUGINS"] = ""
+
+import source_text_extract
+
+# Where the synthetic corpus is generated and where results and the baseline are kept
+BENCHMARK_CORPUS_DIR = os.getenv("BENCHMARK_CORPUS_DIR", "/tmp/gaia_benchmark_corpus")
+BENCHMARK_RESULTS_PATH = os.getenv("BENCHMARK_RESULTS_PATH", "benchmark_results.json")
+BENCHMARK_BASELINE_PATH = os.getenv("BENCHMARK_BASELINE_PATH", "benchmark_baseline.json")
+
+# Timed repetitions per file; the fastest one is compared against the baseline
+BENCHMARK_REPEATS = int(os.getenv("BENCHMARK_REPEATS", 3))
+
+# A case regresses when it is this much slower (or uses this much more memory) than the baseline;
+# cases faster than BENCHMARK_MIN_SECONDS in both runs are too noisy to compare on time
+BENCHMARK_REGRESSION_THRESHOLD = float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", 0.25))
+BENCHMARK_MIN_SECONDS = float(os.getenv("BENCHMARK_MIN_SECONDS", 0.01))
+
+# Seed of the corpus generator, so every run extracts exactly the same files
+CORPUS_SEED = 2024
+
+WORDS = (
+    "benchmark level question answer validation dataset model annotator metadata file source text "
+    "extract table sheet page slide image audio archive record value number result expected steps"
+).split()
+
+
+# Function to generate a deterministic line of words
+def random_line(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+# Function to write a minimal PDF with one text content stream per page (readable by PyPDF2)
+def write_pdf(path, rng, pages, lines_per_page=40):
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = []
+    page_ids = [3 + 2 * index for index in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{' '.join(f'{page_id} 0 R' for page_id in page_ids)}] /Count {pages} >>".encode())
+    font_id = 3 + 2 * pages
+    for page_id in page_ids:
+        lines = [f"({escape(random_line(rng))}) Tj T*" for _ in range(lines_per_page)]
+        stream = ("BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(lines) + " ET").encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 {font_id} 0 R >> >> "
+            f"/Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref_offset = output.tell()
+    output.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        output.write(f"{offset:010d} 00000 n \n".encode())
+    output.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    with open(path, 'wb') as file:
+        file.write(output.getvalue())
+
+# Corpus writers for the other formats; each writes one deterministic file of the requested size
+def write_docx(path, rng, paragraphs):
+    import docx
+    document = docx.Document()
+    for index in range(paragraphs):
+        if index % 20 == 0:
+            document.add_heading(random_line(rng, 4), level=1)
+        document.add_paragraph(random_line(rng, 40))
+    document.save(path)
+
+def write_xlsx(path, rng, rows, columns=10):
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_index in range(2):
+        sheet = workbook.create_sheet(f"Sheet{sheet_index + 1}")
+        sheet.append([f"column_{column}" for column in range(columns)])
+        for _ in range(rows // 2):
+            sheet.append([rng.choice(WORDS) if column % 2 else round(rng.random() * 1000, 2) for column in range(columns)])
+    workbook.save(path)
+
+def write_xls(path, rng, rows, columns=10):
+    import xlwt
+    workbook = xlwt.Workbook()
+    sheet = workbook.add_sheet("Sheet1")
+    for row in range(min(rows, 65535)):
+        for column in range(columns):
+            sheet.write(row, column, rng.choice(WORDS) if column % 2 else round(rng.random() * 1000, 2))
+    workbook.save(path)
+
+def write_csv(path, rng, rows, columns=10):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow([f"column_{column}" for column in range(columns)])
+        for _ in range(rows):
+            writer.writerow([rng.choice(WORDS) if column % 2 else rng.randint(0, 10000) for column in range(columns)])
+
+def write_pptx(path, rng, slides):
+    from pptx import Presentation
+    presentation = Presentation()
+    for _ in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = random_line(rng, 5)
+        slide.placeholders[1].text = "\n".join(random_line(rng) for _ in range(6))
+    presentation.save(path)
+
+def write_image(path, rng, lines, image_format):
+    from PIL import Image, ImageDraw
+    image = Image.new("RGB", (1600, 40 * lines + 80), "white")
+    draw = ImageDraw.Draw(image)
+    for line in range(lines):
+        draw.text((40, 40 + 40 * line), random_line(rng, 8), fill="black")
+    image.save(path, format=image_format)
+
+# Function to synthesise speech-like audio: tone bursts separated by pauses, so silence splitting has work to do
+def audio_frames(rng, seconds, sample_rate=16000):
+    frames = bytearray()
+    elapsed = 0.0
+    while elapsed < seconds:
+        burst = rng.uniform(1.0, 4.0)
+        frequency = rng.uniform(150, 400)
+        for index in range(int(burst * sample_rate)):
+            frames += struct.pack("<h", int(8000 * math.sin(2 * math.pi * frequency * index / sample_rate)))
+        pause = rng.uniform(0.8, 1.5)
+        frames += b"\x00\x00" * int(pause * sample_rate)
+        elapsed += burst + pause
+    return bytes(frames)
+
+def write_wav(path, rng, seconds, sample_rate=16000):
+    with wave.open(path, 'wb') as file:
+        file.setnchannels(1)
+        file.setsampwidth(2)
+        file.setframerate(sample_rate)
+        file.writeframes(audio_frames(rng, seconds, sample_rate))
+
+def write_mp3(path, rng, seconds):
+    from pydub import AudioSegment
+    wav_path = path + ".wav"
+    write_wav(wav_path, rng, seconds)
+    try:
+        AudioSegment.from_wav(wav_path).export(path, format="mp3")
+    finally:
+        os.remove(wav_path)
+
+def write_json(path, rng, records):
+    data = {
+        "@context": {"name": "http://schema.org/name"},
+        "records": [
+            {"id": index, "name": random_line(rng, 3), "tags": rng.sample(WORDS, 3), "score": rng.random(),
+             "nested": {"level": rng.randint(1, 3), "answer": random_line(rng, 2)}}
+            for index in range(records)
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2)
+
+def write_jsonl(path, rng, records):
+    with open(path, 'w', encoding='utf-8') as file:
+        for index in range(records):
+            file.write(json.dumps({"task_id": f"task-{index}", "Question": random_line(rng, 20), "Level": rng.randint(1, 3)}) + "\n")
+
+def write_text(path, rng, lines):
+    with open(path, 'w', encoding='utf-8') as file:
+        for _ in range(lines):
+            file.write(random_line(rng) + "\n")
+
+def write_python(path, rng, functions):
+    with open(path, 'w', encoding='utf-8') as file:
+        for index in range(functions):
+            file.write(f"def function_{index}(value):\n    # {random_line(rng, 6)}\n    return value * {index}\n\n")
+
+def write_xml(path, rng, elements):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8"?>\n<records>\n')
+        for index in range(elements):
+            file.write(f'  <record id="{index}"><name>{random_line(rng, 3)}</name><value>{rng.random():.4f}</value></record>\n')
+        file.write('</records>\n')
+
+def write_pdb(path, rng, atoms):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("HEADER    SYNTHETIC BENCHMARK STRUCTURE\n")
+        for index in range(1, atoms + 1):
+            x, y, z = (rng.uniform(-50, 50) for _ in range(3))
+            file.write(
+                f"ATOM  {index:5d}  CA  ALA A{index % 9999:4d}    {x:8.3f}{y:8.3f}{z:8.3f}  1.00 20.00           C\n"
+            )
+        file.write("END\n")
+
+# Function to write a ZIP of text/JSON/CSV members that contains another ZIP
+def write_zip(path, rng, members):
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, 'w', zipfile.ZIP_DEFLATED) as inner_zip:
+        for index in range(members):
+            inner_zip.writestr(f"inner_{index}.txt", "\n".join(random_line(rng) for _ in range(50)))
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for index in range(members):
+            zip_file.writestr(f"notes_{index}.txt", "\n".join(random_line(rng) for _ in range(50)))
+            zip_file.writestr(f"data_{index}.json", json.dumps({"index": index, "text": random_line(rng, 30)}))
+            zip_file.writestr(f"table_{index}.csv", "\n".join(",".join(rng.sample(WORDS, 5)) for _ in range(50)))
+        zip_file.writestr("nested/inner.zip", inner.getvalue())
+
+# Benchmark cases: file name, writer and its size arguments (scaled by --scale where they are counts)
+CORPUS = [
+    ("pdf_1_page.pdf", write_pdf, {"pages": 1}),
+    ("pdf_20_pages.pdf", write_pdf, {"pages": 20}),
+    ("pdf_200_pages.pdf", write_pdf, {"pages": 200}),
+    ("document.docx", write_docx, {"paragraphs": 400}),
+    ("workbook.xlsx", write_xlsx, {"rows": 10000}),
+    ("workbook.xls", write_xls, {"rows": 10000}),
+    ("table.csv", write_csv, {"rows": 20000}),
+    ("slides.pptx", write_pptx, {"slides": 40}),
+    ("scan.png", write_image, {"lines": 20, "image_format": "PNG"}),
+    ("photo.jpg", write_image, {"lines": 20, "image_format": "JPEG"}),
+    ("photo_small.jpeg", write_image, {"lines": 5, "image_format": "JPEG"}),
+    ("speech.wav", write_wav, {"seconds": 30}),
+    ("speech.mp3", write_mp3, {"seconds": 30}),
+    ("archive.zip", write_zip, {"members": 20}),
+    ("records.json", write_json, {"records": 5000}),
+    ("records.jsonld", write_json, {"records": 1000}),
+    ("records.jsonl", write_jsonl, {"records": 10000}),
+    ("notes.txt", write_text, {"lines": 20000}),
+    ("script.py", write_python, {"functions": 2000}),
+    ("records.xml", write_xml, {"elements": 10000}),
+    ("protein.pdb", write_pdb, {"atoms": 5000}),
+]
+
+# Function to generate the corpus; cases whose writer dependency (e.g. xlwt, ffmpeg) is missing are skipped
+def generate_corpus(corpus_dir, scale=1.0):
+    os.makedirs(corpus_dir, exist_ok=True)
+    generated = []
+    for file_name, writer, arguments in CORPUS:
+        rng = random.Random(f"{CORPUS_SEED}:{file_name}")
+        scaled = {key: max(1, int(value * scale)) if isinstance(value, (int, float)) else value for key, value in arguments.items()}
+        path = os.path.join(corpus_dir, file_name)
+        if file_name.endswith(".mp3") and shutil.which("ffmpeg") is None:
+            print(f"Skipping {file_name}: ffmpeg is not installed.")
+            continue
+        try:
+            writer(path, rng, **scaled)
+        except ImportError as e:
+            print(f"Skipping {file_name}: {e}")
+            continue
+        generated.append(path)
+    return generated
+
+# Function to time one extractor on one file: the best and median of `repeats` runs, plus the peak
+# Python heap of a separate traced run (tracemalloc slows extraction down, so it is not timed)
+def benchmark_file(extractor, file_path, repeats=BENCHMARK_REPEATS):
+    timings = []
+    text = ""
+    status = "ok"
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        try:
+            text = extractor(file_path)
+        except source_text_extract.ExtractionError:
+            text, status = "", "error"
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        try:
+            extractor(file_path)
+        except source_text_extract.ExtractionError:
+            pass
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    input_bytes = os.path.getsize(file_path)
+    best = min(timings)
+    return {
+        "extension": os.path.splitext(file_path)[1].lower(),
+        "function": extractor.__name__,
+        "status": status,
+        "input_bytes": input_bytes,
+        "output_chars": len(text),
+        "seconds_min": best,
+        "seconds_median": statistics.median(timings),
+        "mb_per_second": input_bytes / 1e6 / best if best > 0 else None,
+        "peak_memory_bytes": peak_memory,
+    }
+
+# Function to run every case of the corpus and collect the results
+def run_benchmarks(paths, repeats=BENCHMARK_REPEATS):
+    results = {}
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        extractor = source_text_extract.extract_functions[extension]
+        results[os.path.basename(path)] = result = benchmark_file(extractor, path, repeats)
+        print(
+            f"{os.path.basename(path):<20} {result['function']:<28} {result['status']:<6} "
+            f"{result['seconds_min']:8.3f}s {result['mb_per_second'] or 0:8.2f} MB/s "
+            f"{result['peak_memory_bytes'] / 1e6:8.1f} MB peak"
+        )
+    return results
+
+# Function to compare results with a baseline; returns a list of regression descriptions
+def find_regressions(results, baseline, threshold=BENCHMARK_REGRESSION_THRESHOLD, min_seconds=BENCHMARK_MIN_SECONDS):
+    regressions = []
+    for case, result in results.items():
+        previous = baseline.get(case)
+        if previous is None:
+            continue
+        if previous["status"] == "ok" and result["status"] != "ok":
+            regressions.append(f"{case}: extraction now fails")
+        if max(result["seconds_min"], previous["seconds_min"]) >= min_seconds:
+            if result["seconds_min"] > previous["seconds_min"] * (1 + threshold):
+                regressions.append(
+                    f"{case}: {result['seconds_min']:.3f}s vs {previous['seconds_min']:.3f}s baseline "
+                    f"(+{result['seconds_min'] / previous['seconds_min'] - 1:.0%})"
+                )
+        if previous["peak_memory_bytes"] and result["peak_memory_bytes"] > previous["peak_memory_bytes"] * (1 + threshold):
+            regressions.append(
+                f"{case}: peak memory {result['peak_memory_bytes'] / 1e6:.1f} MB vs "
+                f"{previous['peak_memory_bytes'] / 1e6:.1f} MB baseline"
+            )
+    return regressions
+
+# Function to write a results document as JSON
+def save_results(path, results):
+    document = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(document, file, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the text extractors on a synthetic corpus.")
+    parser.add_argument("--corpus-dir", default=BENCHMARK_CORPUS_DIR)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the size of every corpus file")
+    parser.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS)
+    parser.add_argument("--output", default=BENCHMARK_RESULTS_PATH)
+    parser.add_argument("--baseline", default=BENCHMARK_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    paths = generate_corpus(args.corpus_dir, args.scale)
+    covered = {os.path.splitext(path)[1].lower() for path in paths}
+    missing = sorted(set(source_text_extract.extract_functions) - covered)
+    if missing:
+        print(f"Extensions without a benchmark case: {', '.join(missing)}")
+
+    results = run_benchmarks(paths, args.repeats)
+    save_results(args.output, results)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        save_results(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)["results"]
+        regressions = find_regressions(results, baseline, threshold=args.threshold)
+        if regressions:
+            print("\nPerformance regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against the baseline.")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
@@ -1,6 +1,8 @@
 from dotenv import load_dotenv
 import os
-from google.cloud import storage
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from gcs_utils import crc32c_of_file, get_bucket
 
 # Load environment variables from .env file
 load_dotenv()
@@ -8,31 +10,81 @@ load_dotenv()
 # Now you can securely access the environment variable
 google_credentials = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
 
-def upload_to_gcs(bucket_name, local_folder):
-    """Uploads all files in a local folder to the specified GCS bucket only if they don't already exist in the bucket."""
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    
-    # List all files in the local folder
-    for local_file in os.listdir(local_folder):
+# Number of concurrent uploads
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 8))
+
+def plan_uploads(bucket, local_folder):
+    """Lists the bucket once and diffs it against the local folder by name, size and CRC32C checksum.
+
+    Returns a list of (local_file, local_file_path, reason) for files that are missing or changed in the
+    bucket, and the list of file names that are already up to date.
+    """
+    remote_blobs = {blob.name: blob for blob in bucket.list_blobs()}
+
+    to_upload = []
+    up_to_date = []
+    for local_file in sorted(os.listdir(local_folder)):
         local_file_path = os.path.join(local_folder, local_file)
-        
+
         # Check if it's a file and not a directory
-        if os.path.isfile(local_file_path):
-            # Use the original file name as the destination blob name
-            destination_blob_name = local_file
-
-            blob = bucket.blob(destination_blob_name)
-            
-            # Check if the blob already exists in GCS
-            if not blob.exists():
-                # Upload the file
-                blob.upload_from_filename(local_file_path)
-                print(f"Uploaded {local_file} as {destination_blob_name} in bucket {bucket_name}.")
-            else:
-                print(f"File {destination_blob_name} already exists in the bucket. Skipping upload.")
-
-    print("All files have been processed.")
-
-# Specify your bucket name and local folder path
-upload_to_gcs('gaia_files', 'GAIA/2023/validation')
\ No newline at end of file
+        if not os.path.isfile(local_file_path):
+            continue
+
+        # Use the original file name as the destination blob name
+        blob = remote_blobs.get(local_file)
+        if blob is None:
+            to_upload.append((local_file, local_file_path, "new"))
+        elif blob.size != os.path.getsize(local_file_path):
+            to_upload.append((local_file, local_file_path, "size changed"))
+        elif blob.crc32c != crc32c_of_file(local_file_path):
+            to_upload.append((local_file, local_file_path, "checksum changed"))
+        else:
+            up_to_date.append(local_file)
+    return to_upload, up_to_date
+
+def upload_to_gcs(bucket_name, local_folder, max_workers=UPLOAD_WORKERS, dry_run=False, bucket=None):
+    """Uploads the files in a local folder that are missing or changed in the specified GCS bucket.
+
+    The bucket is listed once instead of calling blob.exists() per file, and the uploads run through a
+    bounded thread pool. With dry_run=True the upload plan is printed and nothing is uploaded.
+    Returns the upload plan and the names of the files that failed to upload.
+    """
+    if bucket is None:
+        bucket = get_bucket(bucket_name)
+
+    to_upload, up_to_date = plan_uploads(bucket, local_folder)
+    print(f"{len(to_upload)} files to upload, {len(up_to_date)} files already up to date in bucket {bucket_name}.")
+
+    if dry_run:
+        for local_file, _, reason in to_upload:
+            print(f"[dry run] Would upload {local_file} ({reason}).")
+        return to_upload, []
+
+    def upload(local_file, local_file_path):
+        bucket.blob(local_file).upload_from_filename(local_file_path)
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(upload, local_file, local_file_path): (local_file, reason)
+            for local_file, local_file_path, reason in to_upload
+        }
+        for future in as_completed(futures):
+            local_file, reason = futures[future]
+            try:
+                future.result()
+                print(f"Uploaded {local_file} ({reason}) in bucket {bucket_name}.")
+            except Exception as e:
+                failed.append(local_file)
+                print(f"Error uploading {local_file}: {e}")
+
+    print(f"All files have been processed. {len(failed)} uploads failed.")
+    return to_upload, failed
+
+# Bucket name and local folder path of the GAIA validation attachments
+BUCKET_NAME = 'gaia_files'
+LOCAL_FOLDER = 'GAIA/2023/validation'
+
+if __name__ == "__main__":
+    # Pass --dry-run to only print the upload plan
+    upload_to_gcs(BUCKET_NAME, LOCAL_FOLDER, dry_run='--dry-run' in sys.argv)
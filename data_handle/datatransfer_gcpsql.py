@@ -4,6 +4,9 @@ import os
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
+from gcs_utils import get_bucket
+from db_bulk import COPY_BATCH_SIZE, copy_dataframe, count_rows, notify_table_changed
+from schema_migration import migrate_schema
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,34 +23,22 @@ BUCKET_NAME = 'gaia_files'
 GCP_FILE_PATH = 'metadata.csv'
 LOCAL_TMP_FILE_PATH = '/tmp/metadata.csv'
 
-# Function to download file from GCP bucket to local /tmp directory
-def download_file_from_gcs(bucket_name, gcp_file_path, local_file_path):
-    try:
-        # Initialize a storage client
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(gcp_file_path)
-
-        # Download the file
-        blob.download_to_filename(local_file_path)
-        print(f"File downloaded from GCS bucket '{bucket_name}' to '{local_file_path}'.")
-    except Exception as e:
-        print(f"Error downloading file from GCS: {e}")
-        exit(1)
-
-# Download the file from GCS
-download_file_from_gcs(BUCKET_NAME, GCP_FILE_PATH, LOCAL_TMP_FILE_PATH)
-
-# Read the CSV file into a DataFrame
-try:
-    df = pd.read_csv(LOCAL_TMP_FILE_PATH)
-    print("CSV file loaded into DataFrame successfully.")
-except Exception as e:
-    print(f"Error reading CSV file: {e}")
-    exit(1)
+# Define the table name
+TABLE_NAME = 'validation'
 
-# Create the connection to the PostgreSQL database
-try:
+# Function to download file from GCP bucket to local /tmp directory
+def download_file_from_gcs(bucket_name, gcp_file_path, local_file_path, bucket=None):
+    # Initialize a storage client
+    if bucket is None:
+        bucket = get_bucket(bucket_name)
+    blob = bucket.blob(gcp_file_path)
+
+    # Download the file
+    blob.download_to_filename(local_file_path)
+    print(f"File downloaded from GCS bucket '{bucket_name}' to '{local_file_path}'.")
+
+# Function to create the connection to the PostgreSQL database
+def connect_to_db():
     conn = psycopg2.connect(
         dbname=DB_NAME,
         user=DB_USERNAME,
@@ -57,24 +48,21 @@ try:
     )
     conn.autocommit = True  # Enable autocommit mode for the connection
     print("Connected to the database successfully.")
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    exit(1)
+    return conn
 
-# Define the table name
-TABLE_NAME = 'validation'
-
-# Function to create table with specified schema
+# Function to create table with specified schema (keyed by task_id, indexed for the level and file_name lookups)
 def create_table(conn, table_name):
     create_table_query = f"""
     CREATE TABLE IF NOT EXISTS {table_name} (
-        task_id VARCHAR(255),
+        task_id VARCHAR(255) PRIMARY KEY,
         question TEXT,
         level TEXT,
         final_answer VARCHAR(255),
         file_name VARCHAR(255),
         annotator_metadata TEXT
     );
+    CREATE INDEX IF NOT EXISTS {table_name}_level_idx ON {table_name} (level);
+    CREATE INDEX IF NOT EXISTS {table_name}_file_name_idx ON {table_name} (file_name);
     """
     try:
         with conn.cursor() as cursor:
@@ -113,6 +101,84 @@ def insert_data(conn, df, table_name):
     except Exception as e:
         print(f"An error occurred while inserting data: {e}")
 
+# Function to bulk load data into the table with COPY FROM STDIN inside a single transaction.
+# The row count of the table is checked afterwards and the whole load is rolled back on a mismatch.
+# With replace=True the table is made to mirror the DataFrame: rows are COPYed into a staging table and
+# upserted by task_id, and tasks no longer in the data are deleted, all in one transaction. The load is
+# idempotent, a failed load leaves the previous contents in place, and columns filled by later steps
+# (source_text) as well as results referencing a task survive a reload. Returns True when it was committed.
+def bulk_insert_data(conn, df, table_name, batch_size=COPY_BATCH_SIZE, replace=False):
+    # Ensure DataFrame columns match the table schema
+    df = df.rename(columns={
+        'task_id': 'task_id',
+        'Question': 'question',
+        'Level': 'level',
+        'Final answer': 'final_answer',
+        'file_name': 'file_name',
+        'Annotator Metadata': 'annotator_metadata'
+    })
+
+    # Select the required columns
+    expected_columns = ['task_id', 'question', 'level', 'final_answer', 'file_name', 'annotator_metadata']
+    df = df[expected_columns]
+
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        with conn:
+            with conn.cursor() as cursor:
+                if replace:
+                    rows_copied = upsert_dataframe(cursor, df, table_name, expected_columns, batch_size=batch_size)
+                    rows_after = count_rows(cursor, table_name)
+                    if rows_after != len(df):
+                        raise RuntimeError(f"row count check failed: expected {len(df)} rows, table has {rows_after}")
+                else:
+                    rows_before = count_rows(cursor, table_name)
+                    rows_copied = copy_dataframe(cursor, df, table_name, expected_columns, batch_size=batch_size)
+                    rows_after = count_rows(cursor, table_name)
+                    if rows_after - rows_before != len(df):
+                        raise RuntimeError(
+                            f"row count check failed: expected {len(df)} new rows, table grew by {rows_after - rows_before}"
+                        )
+                notify_table_changed(cursor, table_name)
+        print(f"Bulk loaded {rows_copied} rows into table '{table_name}' successfully.")
+        return True
+    except Exception as e:
+        print(f"An error occurred while bulk loading data: {e}")
+        return False
+    finally:
+        conn.autocommit = autocommit
+
+# Function to make the table mirror a DataFrame keyed by task_id (runs inside the caller's transaction):
+# COPY into a staging table, upsert every task, delete the tasks that are no longer present
+def upsert_dataframe(cursor, df, table_name, columns, batch_size=COPY_BATCH_SIZE):
+    table = sql.Identifier(table_name)
+    column_list = sql.SQL(', ').join(sql.Identifier(column) for column in columns)
+    cursor.execute(sql.SQL("CREATE TEMP TABLE metadata_staging ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA;").format(
+        columns=column_list,
+        table=table
+    ))
+    rows_copied = copy_dataframe(cursor, df, "metadata_staging", columns, batch_size=batch_size)
+    cursor.execute(sql.SQL("""
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM metadata_staging
+        ON CONFLICT (task_id) DO UPDATE SET {assignments};
+    """).format(
+        table=table,
+        columns=column_list,
+        assignments=sql.SQL(', ').join(
+            sql.SQL("{column} = EXCLUDED.{column}").format(column=sql.Identifier(column))
+            for column in columns if column != 'task_id'
+        )
+    ))
+    cursor.execute(sql.SQL("""
+        DELETE FROM {table} AS target
+        WHERE NOT EXISTS (SELECT 1 FROM metadata_staging AS staging WHERE staging.task_id = target.task_id);
+    """).format(table=table))
+    if cursor.rowcount:
+        print(f"Removed {cursor.rowcount} tasks that are no longer in the metadata from '{table_name}'.")
+    return rows_copied
+
 # Function to truncate the table
 def truncate_table(conn, table_name):
     truncate_query = f"TRUNCATE TABLE {table_name};"
@@ -123,14 +189,37 @@ def truncate_table(conn, table_name):
     except Exception as e:
         print(f"Error truncating table: {e}")
 
-# Create the table
-create_table(conn, TABLE_NAME)
+# Function to load metadata.csv from the bucket into the validation table
+def load_metadata_to_sql(conn, bucket_name=BUCKET_NAME, table_name=TABLE_NAME, bucket=None):
+    # Download the file from GCS
+    download_file_from_gcs(bucket_name, GCP_FILE_PATH, LOCAL_TMP_FILE_PATH, bucket=bucket)
 
-# Optional: Truncate the table before inserting new data
-truncate_table(conn, TABLE_NAME)
+    # Read the CSV file into a DataFrame
+    df = pd.read_csv(LOCAL_TMP_FILE_PATH)
+    print("CSV file loaded into DataFrame successfully.")
+
+    # Create the table, or bring an existing one up to the keyed schema
+    create_table(conn, table_name)
+    if not migrate_schema(conn, table_name):
+        raise RuntimeError(f"schema migration of table '{table_name}' failed")
 
-# Insert data into the table
-insert_data(conn, df, TABLE_NAME)
+    # Replace the table contents with the new data in one transaction (safe to rerun after a failure)
+    if not bulk_insert_data(conn, df, table_name, replace=True):
+        raise RuntimeError(f"bulk load into table '{table_name}' failed")
 
-# Close the database connection
-conn.close()
\ No newline at end of file
+if __name__ == "__main__":
+    # Create the connection to the PostgreSQL database
+    try:
+        conn = connect_to_db()
+    except Exception as e:
+        print(f"Error connecting to the database: {e}")
+        exit(1)
+
+    try:
+        load_metadata_to_sql(conn)
+    except Exception as e:
+        print(f"Error loading metadata into the database: {e}")
+        exit(1)
+    finally:
+        # Close the database connection
+        conn.close()
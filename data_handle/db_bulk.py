@@ -0,0 +1,38 @@
+import io
+import os
+
+from psycopg2 import sql
+
+# Number of DataFrame rows sent per COPY statement
+COPY_BATCH_SIZE = int(os.getenv('COPY_BATCH_SIZE', 5000))
+
+# Channel that tells the app a table changed (its query cache listens on it); the payload is the table name
+DATA_CHANGED_CHANNEL = os.getenv('DATA_CHANGED_CHANNEL', 'gaia_data_changed')
+
+# Function to stream a DataFrame into a table with COPY FROM STDIN, batch_size rows at a time.
+# Rows are serialized as CSV into an in-memory buffer per batch, so only one batch is held as text at once.
+# Missing values are written as unquoted empty fields, which COPY loads as NULL.
+def copy_dataframe(cursor, df, table_name, columns, batch_size=COPY_BATCH_SIZE):
+    copy_query = sql.SQL("COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)").format(
+        table=sql.Identifier(table_name),
+        columns=sql.SQL(', ').join(sql.Identifier(column) for column in columns)
+    ).as_string(cursor)
+
+    rows_copied = 0
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start:start + batch_size]
+        buffer = io.StringIO()
+        batch.to_csv(buffer, index=False, header=False, columns=columns)
+        buffer.seek(0)
+        cursor.copy_expert(copy_query, buffer)
+        rows_copied += len(batch)
+    return rows_copied
+
+# Function to count the rows of a table
+def count_rows(cursor, table_name):
+    cursor.execute(sql.SQL("SELECT COUNT(*) FROM {table};").format(table=sql.Identifier(table_name)))
+    return cursor.fetchone()[0]
+
+# Function to announce that a table changed; the notification is delivered when the transaction commits
+def notify_table_changed(cursor, table_name):
+    cursor.execute("SELECT pg_notify(%s, %s);", (DATA_CHANGED_CHANNEL, table_name))
@@ -0,0 +1,140 @@
+import hashlib
+import importlib.util
+import inspect
+import os
+import sqlite3
+import time
+
+# Default size budget for the cache (text bytes), evicted least recently used first
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Function to hash the contents of a file without reading it into memory at once
+def hash_file(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Function to declare what an extractor's output depends on besides its own code: the modules it delegates
+# to, the environment variables that change its output and the other extractors it calls. All of them are
+# folded into its version, so changing any of them invalidates what it produced before.
+def declare_extractor_dependencies(func, modules=(), settings=(), extractors=()):
+    func.extractor_modules = tuple(modules)
+    func.extractor_settings = tuple(settings)
+    func.extractor_dependencies = tuple(extractors)
+    return func
+
+# Function to read the source of a module without importing it (empty when it cannot be found)
+def module_source(module_name):
+    try:
+        spec = importlib.util.find_spec(module_name)
+        with open(spec.origin, 'rb') as file:
+            return file.read()
+    except (AttributeError, ImportError, OSError, TypeError, ValueError):
+        return b""
+
+# Function to derive the version of an extractor.
+# An explicit `extractor_version` attribute wins; otherwise the source code of the function is hashed
+# together with its declared dependencies (see declare_extractor_dependencies), so editing an extractor or
+# a module it delegates to, or changing a setting that affects its output, invalidates everything it
+# produced before.
+def extractor_version(func):
+    version = getattr(func, "extractor_version", None)
+    if version is not None:
+        return str(version)
+    try:
+        source = inspect.getsource(func).encode('utf-8')
+    except (OSError, TypeError):
+        source = func.__code__.co_code
+    digest = hashlib.sha256(source)
+    for module_name in getattr(func, "extractor_modules", ()):
+        digest.update(module_name.encode('utf-8') + b"\0" + module_source(module_name))
+    for name in getattr(func, "extractor_settings", ()):
+        digest.update(f"{name}={os.getenv(name)}\0".encode('utf-8'))
+    for dependency in getattr(func, "extractor_dependencies", ()):
+        digest.update(extractor_version(dependency).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class ExtractionCache:
+    """Persistent, content-addressed cache for the output of the extract_text_from_* functions.
+
+    Entries are keyed by (file content hash, extractor name, extractor version) and stored in a
+    SQLite file inside `cache_dir`. When the stored text exceeds `max_bytes` (or the number of
+    entries exceeds `max_entries`) the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, max_entries=None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "extraction_cache.sqlite"))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                content_hash TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (content_hash, extractor, version)
+            );
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS extraction_cache_lru ON extraction_cache (last_access);")
+        self.conn.commit()
+
+    # Function to build the cache key for a file and the extractor that will process it
+    def key_for(self, file_path, func):
+        return (hash_file(file_path), func.__name__, extractor_version(func))
+
+    # Function to look up cached text; returns None on a miss
+    def get(self, key):
+        row = self.conn.execute(
+            "SELECT text FROM extraction_cache WHERE content_hash = ? AND extractor = ? AND version = ?;",
+            key
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.conn.execute(
+            "UPDATE extraction_cache SET last_access = ? WHERE content_hash = ? AND extractor = ? AND version = ?;",
+            (time.time(),) + tuple(key)
+        )
+        self.conn.commit()
+        self.hits += 1
+        return row[0]
+
+    # Function to store extracted text and evict old entries if the cache grew past its limits
+    def put(self, key, text):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO extraction_cache (content_hash, extractor, version, text, size, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?);",
+            tuple(key) + (text, len(text.encode('utf-8')), time.time())
+        )
+        self.evict()
+        self.conn.commit()
+
+    # Function to evict least recently used entries until the cache is within its size and entry limits
+    def evict(self):
+        total_size, total_entries = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM extraction_cache;"
+        ).fetchone()
+        if total_size <= self.max_bytes and (self.max_entries is None or total_entries <= self.max_entries):
+            return
+        rows = self.conn.execute(
+            "SELECT rowid, size FROM extraction_cache ORDER BY last_access ASC;"
+        ).fetchall()
+        evicted = []
+        for rowid, size in rows:
+            if total_size <= self.max_bytes and (self.max_entries is None or total_entries <= self.max_entries):
+                break
+            evicted.append((rowid,))
+            total_size -= size
+            total_entries -= 1
+        self.conn.executemany("DELETE FROM extraction_cache WHERE rowid = ?;", evicted)
+
+    def close(self):
+        self.conn.close()
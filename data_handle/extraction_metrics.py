@@ -0,0 +1,213 @@
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+from psycopg2 import sql
+
+from db_bulk import copy_dataframe
+
+# Table the per-file measurements are written to
+METRICS_TABLE = os.getenv("EXTRACTION_METRICS_TABLE", "extraction_metrics")
+
+# A file is flagged as an outlier when it took OUTLIER_FACTOR times the median of its extension
+# (and at least OUTLIER_MIN_SECONDS), or used OUTLIER_FACTOR times the median peak memory
+OUTLIER_FACTOR = float(os.getenv("EXTRACTION_OUTLIER_FACTOR", 5))
+OUTLIER_MIN_SECONDS = float(os.getenv("EXTRACTION_OUTLIER_MIN_SECONDS", 1))
+
+# Columns of the metrics table, in COPY order
+METRICS_COLUMNS = [
+    'run_id', 'file_name', 'extension', 'file_type', 'status', 'cached', 'input_bytes', 'output_chars',
+    'wall_seconds', 'cpu_seconds', 'peak_rss_bytes', 'ocr_confidence', 'ocr_seconds'
+]
+
+# Integer columns, which may be missing for some files (e.g. no peak RSS for images recognised in a batch)
+INTEGER_COLUMNS = ['input_bytes', 'output_chars', 'peak_rss_bytes']
+
+
+# Function to snapshot the clocks before an extraction
+def start_measurement():
+    return {
+        "wall": time.perf_counter(),
+        "cpu": time.process_time(),
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN),
+    }
+
+# Function to measure an extraction since start_measurement: wall time, CPU time (including helper
+# processes such as tesseract or ffmpeg) and the peak RSS of the process. ru_maxrss is a high-water mark,
+# so in a long-lived worker it is the largest footprint reached so far, not just this file's.
+def finish_measurement(snapshot):
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    child_cpu = (children.ru_utime + children.ru_stime) - (snapshot["children"].ru_utime + snapshot["children"].ru_stime)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports ru_maxrss in kilobytes, macOS in bytes
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+    return {
+        "seconds": time.perf_counter() - snapshot["wall"],
+        "cpu_seconds": time.process_time() - snapshot["cpu"] + child_cpu,
+        "peak_rss_bytes": peak_rss,
+    }
+
+# Function to build the metrics row of one extracted file from its structured result
+def metrics_row(run_id, file_path, result):
+    try:
+        input_bytes = os.path.getsize(file_path)
+    except OSError:
+        input_bytes = None
+    return {
+        "run_id": run_id,
+        "file_name": os.path.basename(file_path),
+        "extension": os.path.splitext(file_path)[1].lower() or None,
+        "file_type": result.get("file_type"),
+        "status": result["status"],
+        "cached": bool(result.get("cached", False)),
+        "input_bytes": input_bytes,
+        "output_chars": len(result["text"] or ""),
+        "wall_seconds": result.get("seconds"),
+        "cpu_seconds": result.get("cpu_seconds"),
+        "peak_rss_bytes": result.get("peak_rss_bytes"),
+        "ocr_confidence": result.get("ocr_confidence"),
+        "ocr_seconds": result.get("ocr_seconds"),
+    }
+
+# Function to create the metrics table if it does not exist
+def create_metrics_table(conn, table_name=METRICS_TABLE):
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id SERIAL PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                file_name VARCHAR(255) NOT NULL,
+                extension VARCHAR(32),
+                file_type VARCHAR(64),
+                status VARCHAR(32) NOT NULL,
+                cached BOOLEAN NOT NULL DEFAULT FALSE,
+                input_bytes BIGINT,
+                output_chars BIGINT,
+                wall_seconds DOUBLE PRECISION,
+                cpu_seconds DOUBLE PRECISION,
+                peak_rss_bytes BIGINT,
+                ocr_confidence DOUBLE PRECISION,
+                ocr_seconds DOUBLE PRECISION,
+                recorded_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS ocr_confidence DOUBLE PRECISION;
+            ALTER TABLE {table} ADD COLUMN IF NOT EXISTS ocr_seconds DOUBLE PRECISION;
+        """).format(table=sql.Identifier(table_name)))
+        cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON {table} (run_id);").format(
+            index=sql.Identifier(f"{table_name}_run_id_idx"),
+            table=sql.Identifier(table_name)
+        ))
+
+# Function to write metrics rows with COPY in one transaction. Returns True when they were committed.
+def write_metrics(conn, rows, table_name=METRICS_TABLE):
+    if not rows:
+        return True
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        with conn:
+            create_metrics_table(conn, table_name)
+            with conn.cursor() as cursor:
+                # Nullable integers, so a missing value does not turn the column into floats COPY rejects
+                df = pd.DataFrame(rows, columns=METRICS_COLUMNS).astype({column: 'Int64' for column in INTEGER_COLUMNS})
+                copy_dataframe(cursor, df, table_name, METRICS_COLUMNS)
+        print(f"Recorded extraction metrics for {len(rows)} files in table '{table_name}'.")
+        return True
+    except Exception as e:
+        print(f"Error writing extraction metrics: {e}")
+        return False
+    finally:
+        conn.autocommit = autocommit
+
+# Function to load the metrics of one run (the latest run when run_id is None)
+def load_metrics(conn, run_id=None, table_name=METRICS_TABLE):
+    with conn.cursor() as cursor:
+        if run_id is None:
+            cursor.execute(sql.SQL("SELECT run_id FROM {table} ORDER BY recorded_at DESC, id DESC LIMIT 1;").format(
+                table=sql.Identifier(table_name)
+            ))
+            row = cursor.fetchone()
+            if row is None:
+                return pd.DataFrame(columns=METRICS_COLUMNS)
+            run_id = row[0]
+        cursor.execute(sql.SQL("SELECT {columns} FROM {table} WHERE run_id = %s;").format(
+            columns=sql.SQL(', ').join(sql.Identifier(column) for column in METRICS_COLUMNS),
+            table=sql.Identifier(table_name)
+        ), (run_id,))
+        return pd.DataFrame(cursor.fetchall(), columns=METRICS_COLUMNS)
+
+# Function to summarize metrics by extension: file counts, failures, time, CPU, throughput and memory.
+# Cached files are left out of the timing columns since nothing was extracted for them.
+def summarize_metrics(df):
+    if df.empty:
+        return pd.DataFrame()
+    df = df.assign(
+        extension=df['extension'].fillna('(none)'),
+        failed=df['status'] != 'ok',
+        ocr_confidence=pd.to_numeric(df['ocr_confidence'], errors='coerce'),
+    )
+    measured = df[~df['cached']]
+    summary = df.groupby('extension').agg(
+        files=('file_name', 'count'),
+        failed=('failed', 'sum'),
+        cached=('cached', 'sum'),
+        input_mb=('input_bytes', lambda values: values.sum() / 1e6),
+        output_chars=('output_chars', 'sum'),
+    )
+    timings = measured.groupby('extension').agg(
+        wall_total=('wall_seconds', 'sum'),
+        wall_median=('wall_seconds', 'median'),
+        wall_p95=('wall_seconds', lambda values: values.quantile(0.95)),
+        wall_max=('wall_seconds', 'max'),
+        cpu_total=('cpu_seconds', 'sum'),
+        peak_rss_mb=('peak_rss_bytes', lambda values: values.max() / 1e6),
+        ocr_confidence=('ocr_confidence', 'mean'),
+    )
+    summary = summary.join(timings)
+    summary['mb_per_second'] = summary['input_mb'] / summary['wall_total'].where(summary['wall_total'] > 0)
+    return summary.sort_values('wall_total', ascending=False)
+
+# Function to flag outlier files: much slower, or much hungrier, than the median file of their extension
+def find_outliers(df, factor=OUTLIER_FACTOR, min_seconds=OUTLIER_MIN_SECONDS):
+    measured = df[~df['cached']].copy()
+    if measured.empty:
+        return measured
+    measured['extension'] = measured['extension'].fillna('(none)')
+    medians = measured.groupby('extension')[['wall_seconds', 'peak_rss_bytes']].transform('median')
+    slow = (measured['wall_seconds'] >= min_seconds) & (measured['wall_seconds'] > factor * medians['wall_seconds'])
+    hungry = measured['peak_rss_bytes'] > factor * medians['peak_rss_bytes']
+    failed = measured['status'].isin(['timeout', 'memory_limit', 'cpu_limit', 'crashed'])
+    outliers = measured[slow | hungry | failed].copy()
+    outliers['reason'] = [
+        ", ".join(reason for reason, flagged in (("slow", s), ("memory", h), (status, f)) if flagged)
+        for s, h, f, status in zip(slow[outliers.index], hungry[outliers.index], failed[outliers.index], outliers['status'])
+    ]
+    return outliers.sort_values('wall_seconds', ascending=False)
+
+# Function to print the per-extension summary and the outliers of a run
+def print_metrics_report(df):
+    if df.empty:
+        print("No extraction metrics recorded.")
+        return
+    with pd.option_context('display.width', 200, 'display.max_columns', None, 'display.float_format', '{:.2f}'.format):
+        print("\nExtraction metrics by extension:")
+        print(summarize_metrics(df).to_string())
+        outliers = find_outliers(df)
+        if not outliers.empty:
+            print("\nOutliers:")
+            print(outliers[['file_name', 'status', 'input_bytes', 'wall_seconds', 'cpu_seconds', 'peak_rss_bytes', 'reason']].to_string(index=False))
+
+if __name__ == "__main__":
+    # Print the report of a run from the database: pass a run id, or nothing for the latest run
+    import source_text_extract
+
+    conn = source_text_extract.connect_to_db()
+    if conn is None:
+        sys.exit(1)
+    try:
+        print_metrics_report(load_metrics(conn, sys.argv[1] if len(sys.argv) > 1 else None))
+    finally:
+        conn.close()
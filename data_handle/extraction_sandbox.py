@@ -0,0 +1,205 @@
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
+import resource
+import signal
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+# Per-file limits: wall-clock timeout, address space and CPU time (0 disables a limit)
+SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", 300))
+SANDBOX_MAX_MEMORY_BYTES = int(os.getenv("SANDBOX_MAX_MEMORY_BYTES", 4 * 1024 * 1024 * 1024))
+SANDBOX_MAX_CPU_SECONDS = int(os.getenv("SANDBOX_MAX_CPU_SECONDS", 600))
+
+# Number of files a worker process extracts before it is replaced by a fresh one
+SANDBOX_MAX_TASKS_PER_WORKER = int(os.getenv("SANDBOX_MAX_TASKS_PER_WORKER", 50))
+
+
+class ExtractionError(Exception):
+    """Raised by an extractor that could not produce text; status becomes the status of the result."""
+
+    def __init__(self, message, status="error"):
+        super().__init__(message)
+        self.status = status
+
+
+# Function to build a structured extraction result
+def extraction_result(status, text=None, error=None, seconds=0.0):
+    return {"status": status, "text": text, "error": error, "seconds": seconds}
+
+# Function to cap the address space of the current process
+def apply_memory_limit(max_memory_bytes):
+    if max_memory_bytes:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            max_memory_bytes = min(max_memory_bytes, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, hard))
+
+# Function to allow the current process max_cpu_seconds more CPU time; only the soft limit is moved,
+# so it can be raised again for the next task (exceeding it kills the process with SIGXCPU)
+def apply_cpu_limit(max_cpu_seconds):
+    if max_cpu_seconds:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = int(usage.ru_utime + usage.ru_stime) + max_cpu_seconds
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+# Main loop of a sandbox worker process: receive a file path, run the extraction, send back the result
+def worker_main(conn, run_extraction, max_memory_bytes, max_cpu_seconds):
+    # Lead a process group of its own, so killing the worker also kills the processes an extractor started
+    os.setpgrp()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    apply_memory_limit(max_memory_bytes)
+    while True:
+        try:
+            file_path = conn.recv()
+        except EOFError:
+            break
+        if file_path is None:
+            break
+        apply_cpu_limit(max_cpu_seconds)
+        start = time.perf_counter()
+        try:
+            result = run_extraction(file_path)
+        except MemoryError:
+            result = extraction_result("memory_limit", error="extraction exceeded the memory limit")
+        except ExtractionError as e:
+            result = extraction_result(e.status, error=str(e))
+        except Exception as e:
+            result = extraction_result("error", error=f"{type(e).__name__}: {e}")
+        result["seconds"] = time.perf_counter() - start
+        conn.send(result)
+
+
+class SandboxWorker:
+    """A worker process that extracts one file at a time under memory/CPU limits and a wall-clock timeout.
+
+    The process is killed and replaced when a task times out or crashes, when it hit the memory limit,
+    and after SANDBOX_MAX_TASKS_PER_WORKER tasks.
+    """
+
+    def __init__(self, run_extraction, timeout=SANDBOX_TIMEOUT_SECONDS, max_memory_bytes=SANDBOX_MAX_MEMORY_BYTES,
+                 max_cpu_seconds=SANDBOX_MAX_CPU_SECONDS, max_tasks=SANDBOX_MAX_TASKS_PER_WORKER):
+        self.run_extraction = run_extraction
+        self.timeout = timeout or None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_cpu_seconds = max_cpu_seconds
+        self.max_tasks = max_tasks
+        self.process = None
+        self.conn = None
+        self.start()
+
+    # Workers are not daemonic, since daemonic processes cannot start the process pools some extractors
+    # use (page-parallel PDF extraction); stop() and the exit hook below clean them up instead
+    def start(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=worker_main,
+            args=(child_conn, self.run_extraction, self.max_memory_bytes, self.max_cpu_seconds)
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+        live_workers.add(self)
+
+    # Function to kill the worker's process group, or just the worker if it has not set up its group yet
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+
+    def stop(self, kill=False):
+        if self.process is None:
+            return
+        if kill or not self.process.is_alive():
+            self.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                self.kill()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        live_workers.discard(self)
+
+    def restart(self, kill=True):
+        self.stop(kill=kill)
+        self.start()
+
+    # Function to extract one file in the worker and return a structured result
+    def run(self, file_path):
+        start = time.perf_counter()
+        self.tasks += 1
+        try:
+            self.conn.send(file_path)
+            if not self.conn.poll(self.timeout):
+                self.restart()
+                return extraction_result(
+                    "timeout", error=f"extraction exceeded {self.timeout:.0f}s", seconds=time.perf_counter() - start
+                )
+            result = self.conn.recv()
+        except (EOFError, BrokenPipeError, OSError):
+            self.process.join(timeout=5)
+            exitcode = self.process.exitcode
+            self.restart()
+            if exitcode == -signal.SIGXCPU:
+                status, error = "cpu_limit", f"extraction exceeded {self.max_cpu_seconds}s of CPU time"
+            else:
+                status, error = "crashed", f"worker exited with code {exitcode}"
+            return extraction_result(status, error=error, seconds=time.perf_counter() - start)
+
+        if result["status"] == "memory_limit" or self.tasks >= self.max_tasks:
+            self.restart(kill=False)
+        return result
+
+
+# Workers still running when the interpreter exits are stopped before multiprocessing joins its
+# non-daemonic children (finalizers with an exit priority run first)
+live_workers = weakref.WeakSet()
+
+def stop_live_workers():
+    for worker in list(live_workers):
+        worker.stop(kill=True)
+
+multiprocessing.util.Finalize(None, stop_live_workers, exitpriority=10)
+
+
+class SandboxPool:
+    """A fixed number of SandboxWorkers fed from a thread pool; submit() returns a Future of the result."""
+
+    def __init__(self, run_extraction, workers, **worker_options):
+        self.workers = [SandboxWorker(run_extraction, **worker_options) for _ in range(max(1, workers))]
+        self.idle = queue.Queue()
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.workers))
+
+    def _run(self, file_path):
+        worker = self.idle.get()
+        try:
+            return worker.run(file_path)
+        finally:
+            self.idle.put(worker)
+
+    def submit(self, file_path):
+        return self.executor.submit(self._run, file_path)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for worker in self.workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
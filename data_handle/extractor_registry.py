@@ -0,0 +1,134 @@
+import importlib
+import os
+import zipfile
+from collections.abc import Mapping
+
+# MIME types of the Office Open XML formats, told apart by the folders inside the ZIP container
+OOXML_MIME_TYPES = {
+    "word/": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "xl/": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "ppt/": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+# Number of leading bytes read to sniff a file's type
+SNIFF_BYTES = 16
+
+# Byte order marks of Unicode text files (UTF-8, UTF-16 LE/BE); UTF-16 LE starts like an MPEG frame
+TEXT_BOMS = (b"\xef\xbb\xbf", b"\xff\xfe", b"\xfe\xff")
+
+
+# Function to tell whether bytes start with a valid MPEG audio frame header: frame sync, then version,
+# layer, bitrate and sampling rate fields that are not the reserved/invalid values
+def is_mpeg_frame_header(header):
+    if len(header) < 3 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return False
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sampling_rate_index = (header[2] >> 2) & 0x03
+    return version != 0x01 and layer != 0x00 and bitrate_index != 0x0F and sampling_rate_index != 0x03
+
+
+# Function to guess the MIME type of a file from its leading bytes (None when the bytes are not recognised,
+# which is the case for the plain-text formats; those are dispatched by extension)
+def sniff_mime_type(file_path):
+    with open(file_path, 'rb') as file:
+        header = file.read(SNIFF_BYTES)
+
+    # Unicode text with a byte order mark is dispatched by extension like any other text
+    if header.startswith(TEXT_BOMS):
+        return None
+    if header.startswith(b"%PDF"):
+        return "application/pdf"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if header.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "audio/wav"
+    if header.startswith(b"ID3") or is_mpeg_frame_header(header):
+        return "audio/mpeg"
+    if header.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return "application/vnd.ms-excel"
+    if header.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(file_path) as zip_ref:
+                names = zip_ref.namelist()
+        except zipfile.BadZipFile:
+            return None
+        for folder, mime_type in OOXML_MIME_TYPES.items():
+            if any(name.startswith(folder) for name in names):
+                return mime_type
+        return "application/zip"
+    if header.lstrip().startswith(b"<?xml"):
+        return "application/xml"
+    return None
+
+
+class ExtractorRegistry:
+    """Registry of text extractors by file type.
+
+    An extractor is registered either as a callable or as a "module:function" string; string extractors
+    are imported the first time a file of that type is seen, so a format's dependencies are only loaded
+    when they are needed. Files are dispatched by sniffed MIME type first and by extension as a fallback.
+    """
+
+    def __init__(self):
+        self.extractors = {}  # file type -> callable or "module:function"
+        self.extensions = {}  # extension -> file type
+        self.mime_types = {}  # MIME type -> file type
+
+    # Function to register (or replace) the extractor of a file type
+    def register(self, file_type, extractor, extensions=(), mime_types=()):
+        self.extractors[file_type] = extractor
+        for extension in extensions:
+            self.extensions[extension.lower()] = file_type
+        for mime_type in mime_types:
+            self.mime_types[mime_type] = file_type
+
+    # Function to return the extractor of a file type, importing it on first use
+    def load(self, file_type):
+        extractor = self.extractors[file_type]
+        if isinstance(extractor, str):
+            module_name, _, function_name = extractor.partition(":")
+            extractor = getattr(importlib.import_module(module_name), function_name)
+            self.extractors[file_type] = extractor
+        return extractor
+
+    # Function to find the file type of a file: sniffed MIME type first, extension as the fallback
+    def detect(self, file_path):
+        try:
+            mime_type = sniff_mime_type(file_path)
+        except OSError:
+            mime_type = None
+        if mime_type in self.mime_types:
+            return self.mime_types[mime_type]
+        return self.extensions.get(os.path.splitext(file_path)[1].lower())
+
+    # Function to return the extractor for a file (None when no extractor handles it)
+    def extractor_for(self, file_path):
+        file_type = self.detect(file_path)
+        return None if file_type is None else self.load(file_type)
+
+    # Function to return a read-only, extension-keyed view of the registry
+    def by_extension(self):
+        return ExtensionView(self)
+
+
+class ExtensionView(Mapping):
+    """Extension -> extractor mapping backed by a registry; extractors are loaded when looked up."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __getitem__(self, extension):
+        return self.registry.load(self.registry.extensions[extension])
+
+    def __iter__(self):
+        return iter(self.registry.extensions)
+
+    def __len__(self):
+        return len(self.registry.extensions)
+
+    def __contains__(self, extension):
+        return extension in self.registry.extensions
@@ -0,0 +1,92 @@
+import base64
+import os
+import shutil
+
+import google_crc32c
+from google.cloud import storage
+
+# Function to compute the CRC32C checksum of a local file in the base64 format GCS reports for blobs
+def crc32c_of_file(file_path, chunk_size=1024 * 1024):
+    checksum = google_crc32c.Checksum()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            checksum.update(chunk)
+    return base64.b64encode(checksum.digest()).decode('utf-8')
+
+
+class LocalBlob:
+    """Filesystem-backed stand-in for google.cloud.storage.Blob (name, size, generation, crc32c)."""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.root, name)
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path) if os.path.exists(self.path) else None
+
+    @property
+    def generation(self):
+        return os.stat(self.path).st_mtime_ns if os.path.exists(self.path) else None
+
+    @property
+    def crc32c(self):
+        return crc32c_of_file(self.path) if os.path.exists(self.path) else None
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def reload(self):
+        pass
+
+    def download_to_filename(self, filename):
+        shutil.copyfile(self.path, filename)
+
+    def upload_from_filename(self, filename):
+        os.makedirs(os.path.dirname(self.path) or self.bucket.root, exist_ok=True)
+        shutil.copyfile(filename, self.path)
+
+    def open(self, mode='r', **kwargs):
+        if 'w' in mode:
+            os.makedirs(os.path.dirname(self.path) or self.bucket.root, exist_ok=True)
+        if 'b' not in mode:
+            kwargs.setdefault('encoding', 'utf-8')
+            kwargs.setdefault('newline', '')
+        kwargs.pop('chunk_size', None)
+        kwargs.pop('ignore_flush', None)
+        return open(self.path, mode, **kwargs)
+
+
+class LocalBucket:
+    """Filesystem-backed stand-in for google.cloud.storage.Bucket, rooted at a local directory.
+
+    Used for offline runs and tests: pass a bucket name of the form `file:///path/to/dir`.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.name = root
+
+    def blob(self, blob_name):
+        return LocalBlob(self, blob_name)
+
+    def get_blob(self, blob_name):
+        blob = self.blob(blob_name)
+        return blob if blob.exists() else None
+
+    def list_blobs(self, prefix=None):
+        for dirpath, _, file_names in os.walk(self.root):
+            for file_name in sorted(file_names):
+                blob_name = os.path.relpath(os.path.join(dirpath, file_name), self.root).replace(os.sep, '/')
+                if prefix is None or blob_name.startswith(prefix):
+                    yield LocalBlob(self, blob_name)
+
+
+# Function to resolve a bucket name to a GCS bucket, or to a LocalBucket for `file://` names
+def get_bucket(bucket_name, client=None):
+    if bucket_name.startswith("file://"):
+        return LocalBucket(bucket_name[len("file://"):])
+    if client is None:
+        client = storage.Client()
+    return client.bucket(bucket_name)
@@ -2,6 +2,7 @@ import json
 import csv
 import os
 from google.cloud import storage
+from gcs_utils import get_bucket
 
 def download_blob(bucket_name, source_blob_name, destination_file_name):
     """Downloads a blob from the bucket."""
@@ -21,49 +22,83 @@ def upload_blob(bucket_name, source_file_name, destination_blob_name):
 
     print(f"File {source_file_name} uploaded to {destination_blob_name}.")
 
-def convert_jsonl_to_csv(jsonl_file, csv_file):
-    """Reads a JSONL file and converts it to a CSV file."""
-    
-    # Open the JSONL file and read the lines
-    with open(jsonl_file, 'r') as jsonl_fp, open(csv_file, 'w', newline='') as csv_fp:
-        writer = None
+# Chunk size for streaming reads/writes between GCS objects (must be a multiple of 256 KB)
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+def collect_jsonl_fieldnames(jsonl_fp):
+    """Reads a JSONL stream once and returns the union of the keys of all records, in first-seen order."""
+    fieldnames = {}
+    for line in jsonl_fp:
+        if not line.strip():
+            continue
+        for key in json.loads(line):
+            fieldnames.setdefault(key, None)
+    return list(fieldnames)
+
+def write_jsonl_as_csv(jsonl_fp, csv_fp, fieldnames):
+    """Streams JSONL records into a CSV writer one line at a time.
 
-        # Read each line from the JSONL file
-        for line in jsonl_fp:
-            # Parse the JSON data
-            data = json.loads(line)
+    Records missing a column get an empty value and keys outside `fieldnames` are dropped,
+    so records whose key sets differ still line up under one header.
+    """
+    writer = csv.DictWriter(csv_fp, fieldnames=fieldnames, restval='', extrasaction='ignore')
+    writer.writeheader()
 
-            # Initialize the CSV writer with headers based on the first JSON object
-            if writer is None:
-                headers = data.keys()  # Get the JSON keys to use as CSV headers
-                writer = csv.DictWriter(csv_fp, fieldnames=headers)
-                writer.writeheader()
+    rows = 0
+    for line in jsonl_fp:
+        if not line.strip():
+            continue
+        writer.writerow(json.loads(line))
+        rows += 1
+    return rows
 
-            # Write the JSON data to CSV row by row
-            writer.writerow(data)
+def convert_jsonl_to_csv(jsonl_file, csv_file, fieldnames=None):
+    """Reads a JSONL file and converts it to a CSV file.
+
+    Without an explicit schema the header is the union of keys over all records (computed in a first pass).
+    """
+    if fieldnames is None:
+        with open(jsonl_file, 'r') as jsonl_fp:
+            fieldnames = collect_jsonl_fieldnames(jsonl_fp)
+
+    with open(jsonl_file, 'r') as jsonl_fp, open(csv_file, 'w', newline='') as csv_fp:
+        write_jsonl_as_csv(jsonl_fp, csv_fp, fieldnames)
     
     print(f"Converted {jsonl_file} to {csv_file}.")
 
-def process_jsonl_to_csv_in_gcs(bucket_name, jsonl_blob_path, csv_blob_path):
-    """Downloads JSONL file from GCS, converts it to CSV, and uploads CSV back to GCS."""
-    
-    # Temporary file paths for local storage
-    temp_jsonl_file = '/tmp/temp_metadata.jsonl'
-    temp_csv_file = '/tmp/temp_metadata.csv'
-    
-    # Step 1: Download the JSONL file from GCS to a local temporary file
-    download_blob(bucket_name, jsonl_blob_path, temp_jsonl_file)
-    
-    # Step 2: Convert the JSONL file to CSV
-    convert_jsonl_to_csv(temp_jsonl_file, temp_csv_file)
-    
-    # Step 3: Upload the CSV file back to GCS
-    upload_blob(bucket_name, temp_csv_file, csv_blob_path)
+def process_jsonl_to_csv_in_gcs(bucket_name, jsonl_blob_path, csv_blob_path, fieldnames=None, bucket=None):
+    """Converts a JSONL blob to a CSV blob by streaming between the two objects.
+
+    The source is read through a streaming download and the CSV is written through a streaming (resumable)
+    upload, so neither local disk nor memory grows with the size of the metadata. Without an explicit
+    schema the source is streamed twice: once to compute the union of keys and once to write the rows.
+    """
+    if bucket is None:
+        bucket = get_bucket(bucket_name)
+
+    # get_blob pins the generation, so both passes read the same version of the source
+    jsonl_blob = bucket.get_blob(jsonl_blob_path)
+    if jsonl_blob is None:
+        raise FileNotFoundError(f"Blob {jsonl_blob_path} not found in bucket {bucket_name}.")
+
+    # Pass 1: compute the header from the union of keys
+    if fieldnames is None:
+        with jsonl_blob.open('r', encoding='utf-8', chunk_size=STREAM_CHUNK_SIZE) as jsonl_fp:
+            fieldnames = collect_jsonl_fieldnames(jsonl_fp)
+
+    # Pass 2: stream the rows straight into the CSV blob
+    csv_blob = bucket.blob(csv_blob_path)
+    with jsonl_blob.open('r', encoding='utf-8', chunk_size=STREAM_CHUNK_SIZE) as jsonl_fp, \
+            csv_blob.open('w', encoding='utf-8', newline='', chunk_size=STREAM_CHUNK_SIZE) as csv_fp:
+        rows = write_jsonl_as_csv(jsonl_fp, csv_fp, fieldnames)
+
+    print(f"Streamed {rows} records from {jsonl_blob_path} to {csv_blob_path} ({len(fieldnames)} columns).")
 
 # Set the GCS bucket and file paths
 bucket_name = 'gaia_files'
 jsonl_blob_path = 'metadata.jsonl'  # Path to JSONL in GCS
 csv_blob_path = 'metadata.csv'      # Path where CSV will be saved in GCS
 
-# Process JSONL to CSV in GCS
-process_jsonl_to_csv_in_gcs(bucket_name, jsonl_blob_path, csv_blob_path)
+if __name__ == "__main__":
+    # Process JSONL to CSV in GCS
+    process_jsonl_to_csv_in_gcs(bucket_name, jsonl_blob_path, csv_blob_path)
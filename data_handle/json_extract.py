@@ -0,0 +1,171 @@
+import json
+import os
+
+import ijson
+
+# Output style: "compact" re-emits minified JSON, "flatten" emits one `key.path[0]: value` line per scalar
+JSON_OUTPUT_MODE = os.getenv("JSON_OUTPUT_MODE", "compact")
+
+# Maximum number of characters emitted for one file; parsing stops once it is reached
+JSON_MAX_CHARS = int(os.getenv("JSON_MAX_CHARS", 2_000_000))
+
+TRUNCATED_MARKER = "\n[truncated]"
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class TextBudget:
+    """Accumulates output pieces until the character budget is used up."""
+
+    def __init__(self, max_chars=JSON_MAX_CHARS):
+        self.max_chars = max_chars
+        self.parts = []
+        self.chars = 0
+        self.truncated = False
+
+    def write(self, piece):
+        if self.chars + len(piece) > self.max_chars:
+            self.parts.append(piece[:self.max_chars - self.chars])
+            self.chars = self.max_chars
+            self.truncated = True
+            raise BudgetExceeded()
+        self.parts.append(piece)
+        self.chars += len(piece)
+
+    def text(self):
+        return "".join(self.parts) + (TRUNCATED_MARKER if self.truncated else "")
+
+
+# Function to turn an already parsed Python value into the same events ijson.basic_parse produces,
+# iteratively so deeply nested values cannot hit the recursion limit
+def iter_value_events(value):
+    stack = [("value", value)]
+    while stack:
+        kind, item = stack.pop()
+        if kind == "event":
+            yield item
+        elif isinstance(item, dict):
+            stack.append(("event", ("end_map", None)))
+            for key, child in reversed(list(item.items())):
+                stack.append(("value", child))
+                stack.append(("event", ("map_key", key)))
+            stack.append(("event", ("start_map", None)))
+        elif isinstance(item, list):
+            stack.append(("event", ("end_array", None)))
+            for child in reversed(item):
+                stack.append(("value", child))
+            stack.append(("event", ("start_array", None)))
+        elif item is None:
+            yield ("null", None)
+        elif isinstance(item, bool):
+            yield ("boolean", item)
+        elif isinstance(item, str):
+            yield ("string", item)
+        else:
+            yield ("number", item)
+
+# Function to render a scalar event value the way JSON would
+def scalar_text(event, value, quote_strings):
+    if event == "null":
+        return "null"
+    if event == "boolean":
+        return "true" if value else "false"
+    if event == "string":
+        return json.dumps(value, ensure_ascii=False) if quote_strings else value
+    return str(value)
+
+# Function to write parse events as minified JSON
+def write_compact(events, budget):
+    # Each frame records whether the next item in the open container needs a leading comma
+    needs_comma = []
+    for event, value in events:
+        if event == "map_key":
+            budget.write(("," if needs_comma[-1] else "") + json.dumps(value, ensure_ascii=False) + ":")
+            needs_comma[-1] = False
+            continue
+        if event in ("end_map", "end_array"):
+            needs_comma.pop()
+            budget.write("}" if event == "end_map" else "]")
+            if needs_comma:
+                needs_comma[-1] = True
+            continue
+        prefix = "," if needs_comma and needs_comma[-1] else ""
+        if event in ("start_map", "start_array"):
+            budget.write(prefix + ("{" if event == "start_map" else "["))
+            needs_comma.append(False)
+            continue
+        budget.write(prefix + scalar_text(event, value, quote_strings=True))
+        if needs_comma:
+            needs_comma[-1] = True
+
+# Function to write parse events as one `key.path[index]: value` line per scalar
+def write_flattened(events, budget, root=""):
+    # Each frame is [container type, current key or index]
+    path = []
+
+    def current_path():
+        parts = [root] if root else []
+        for container, position in path:
+            if container == "array":
+                parts.append(f"[{position}]")
+            elif position is not None:
+                parts.append(("." if parts else "") + str(position))
+        return "".join(parts) or "$"
+
+    def advance():
+        if path and path[-1][0] == "array":
+            path[-1][1] += 1
+
+    for event, value in events:
+        if event == "map_key":
+            path[-1][1] = value
+        elif event == "start_map":
+            path.append(["map", None])
+        elif event == "start_array":
+            path.append(["array", 0])
+        elif event in ("end_map", "end_array"):
+            path.pop()
+            advance()
+        else:
+            budget.write(f"{current_path()}: {scalar_text(event, value, quote_strings=False)}\n")
+            advance()
+
+# Function to write events in the configured output mode
+def write_events(events, budget, mode, root=""):
+    if mode == "flatten":
+        write_flattened(events, budget, root=root)
+    else:
+        write_compact(events, budget)
+
+# Function to extract a JSON (or JSON-LD) document by parsing it incrementally with ijson,
+# so the document is never held in memory as a whole and parsing stops once the budget is used
+def extract_json_text(file_path, mode=JSON_OUTPUT_MODE, max_chars=JSON_MAX_CHARS):
+    budget = TextBudget(max_chars)
+    with open(file_path, 'rb') as file:
+        try:
+            write_events(ijson.basic_parse(file, use_float=True), budget, mode)
+        except BudgetExceeded:
+            pass
+    return budget.text()
+
+# Function to extract a JSONL file line by line; malformed lines are reported by line number and skipped
+def extract_jsonl_text(file_path, mode=JSON_OUTPUT_MODE, max_chars=JSON_MAX_CHARS):
+    budget = TextBudget(max_chars)
+    with open(file_path, 'r', encoding='utf-8') as file:
+        try:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    value = json.loads(line)
+                except json.JSONDecodeError as e:
+                    budget.write(f"Invalid JSON in line {line_number}: {e}\n")
+                    continue
+                write_events(iter_value_events(value), budget, mode, root=f"[{line_number}]")
+                if mode != "flatten":
+                    budget.write("\n")
+        except BudgetExceeded:
+            pass
+    return budget.text()
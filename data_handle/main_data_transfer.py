@@ -1,23 +1,265 @@
-import subprocess
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-def run_script(script_name):
+from google.cloud import storage
+
+import datatransfer_gcpbucket
+import datatransfer_gcpsql
+import json_csv_gaia
+import source_text_extract
+from extraction_cache import extractor_version
+from gcs_utils import get_bucket
+from run_manifest import RunManifest
+
+# Where the fingerprints of the last successful run of every stage are kept
+PIPELINE_STATE_PATH = os.getenv('PIPELINE_STATE_PATH', '/tmp/gaia_pipeline_state.json')
+
+# Maximum number of stages running at the same time
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', 4))
+
+
+class Stage:
+    """One step of the ingest pipeline.
+
+    `run(context)` does the work, `fingerprint(context)` returns a string describing the stage's inputs
+    (or None when they cannot be fingerprinted, which forces the stage to run), and `depends_on` names the
+    stages that must finish first.
+    """
+
+    def __init__(self, name, run, depends_on=(), fingerprint=None):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.fingerprint = fingerprint
+
+
+class PipelineContext:
+    """Clients shared by every stage of a run: one storage client/bucket and one database connection,
+    plus the run manifest the stages checkpoint their progress in (None disables checkpointing)."""
+
+    def __init__(self, bucket_name, manifest=None):
+        self.bucket_name = bucket_name
+        self.manifest = manifest
+        self.storage_client = None if bucket_name.startswith("file://") else storage.Client()
+        self.bucket = get_bucket(bucket_name, client=self.storage_client)
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = datatransfer_gcpsql.connect_to_db()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+
+
+# Function to hash a list of values into a short fingerprint
+def hash_values(values):
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+# Function to fingerprint the files of a local directory by name, size and modification time
+def fingerprint_directory(directory):
+    if not os.path.isdir(directory):
+        return None
+    entries = []
+    for file_name in sorted(os.listdir(directory)):
+        stat = os.stat(os.path.join(directory, file_name))
+        entries.append((file_name, stat.st_size, stat.st_mtime_ns))
+    return hash_values(entries)
+
+# Function to fingerprint a blob by its generation (None when the blob does not exist)
+def fingerprint_blob(bucket, blob_name):
+    blob = bucket.get_blob(blob_name)
+    return None if blob is None else hash_values([blob_name, blob.generation])
+
+# Function to fingerprint the bucket listing by blob name and generation
+def fingerprint_bucket(bucket):
+    return hash_values([(blob.name, blob.generation) for blob in bucket.list_blobs()])
+
+
+# Stage functions; each raises when its step did not complete so the stage is not recorded as done
+def upload_attachments(ctx):
+    failed = datatransfer_gcpbucket.upload_to_gcs(ctx.bucket_name, datatransfer_gcpbucket.LOCAL_FOLDER, bucket=ctx.bucket)[1]
+    if failed:
+        raise RuntimeError(f"{len(failed)} uploads failed")
+
+def convert_metadata(ctx):
+    json_csv_gaia.process_jsonl_to_csv_in_gcs(
+        ctx.bucket_name, json_csv_gaia.jsonl_blob_path, json_csv_gaia.csv_blob_path, bucket=ctx.bucket
+    )
+
+def load_metadata(ctx):
+    datatransfer_gcpsql.load_metadata_to_sql(ctx.conn, ctx.bucket_name, datatransfer_gcpsql.TABLE_NAME, bucket=ctx.bucket)
+
+def download_attachments(ctx):
+    stats = source_text_extract.download_files_to_directory(
+        ctx.bucket_name, source_text_extract.LOCAL_DIR, sync=True, bucket=ctx.bucket
+    )
+    if stats.get("failed_files") or stats.get("error"):
+        raise RuntimeError(f"sync did not complete: {stats}")
+
+def extract_source_text(ctx):
+    source_text_extract.update_source_text(
+        ctx.conn, datatransfer_gcpsql.TABLE_NAME, source_text_extract.LOCAL_DIR, manifest=ctx.manifest
+    )
+
+# Function to define the stages and their dependencies
+def build_stages():
+    return [
+        Stage(
+            "upload_attachments", upload_attachments,
+            fingerprint=lambda ctx: fingerprint_directory(datatransfer_gcpbucket.LOCAL_FOLDER),
+        ),
+        Stage(
+            "convert_metadata", convert_metadata,
+            depends_on=["upload_attachments"],
+            fingerprint=lambda ctx: fingerprint_blob(ctx.bucket, json_csv_gaia.jsonl_blob_path),
+        ),
+        Stage(
+            "load_metadata", load_metadata,
+            depends_on=["convert_metadata"],
+            fingerprint=lambda ctx: fingerprint_blob(ctx.bucket, datatransfer_gcpsql.GCP_FILE_PATH),
+        ),
+        Stage(
+            "download_attachments", download_attachments,
+            depends_on=["upload_attachments"],
+            fingerprint=lambda ctx: fingerprint_bucket(ctx.bucket),
+        ),
+        Stage(
+            "extract_source_text", extract_source_text,
+            depends_on=["load_metadata", "download_attachments"],
+            fingerprint=lambda ctx: hash_values([
+                fingerprint_directory(source_text_extract.LOCAL_DIR),
+                sorted((ext, extractor_version(func)) for ext, func in source_text_extract.extract_functions.items()),
+            ]),
+        ),
+    ]
+
+# Function to load the fingerprints of the last successful run of every stage
+def load_state(state_path):
+    if not os.path.exists(state_path):
+        return {}
     try:
-        print(f"Running {script_name}...")
-        result = subprocess.run(['python3', script_name], check=True, capture_output=True, text=True)
-        print(f"Output of {script_name}:\n{result.stdout}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error while running {script_name}: {e.stderr}")
-        raise
+        with open(state_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring unreadable pipeline state: {e}")
+        return {}
+
+# Function to save the stage fingerprints atomically
+def save_state(state_path, state):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+# Function to run the stages as a dependency graph.
+# Stages whose dependencies are done run concurrently; a stage is skipped when its input fingerprint
+# (combined with the fingerprints of its dependencies) matches the last successful run.
+# When the context carries a run manifest, stage progress is recorded in it and stages that already
+# finished in a resumed run are not run again ("resumed").
+def run_pipeline(stages, context, state_path=PIPELINE_STATE_PATH, max_workers=PIPELINE_WORKERS, force=False):
+    stages_by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in stages_by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+    state = load_state(state_path)
+    manifest = context.manifest
+    fingerprints = {}
+    outcomes = {}  # stage name -> "ran", "skipped", "resumed", "failed" or "blocked"
+    succeeded = ("ran", "skipped", "resumed")
+    timings = {}
+
+    # Function to fingerprint and (unless unchanged) run a single stage
+    def execute(stage):
+        start = time.perf_counter()
+        if manifest is not None and manifest.stage_done(stage.name):
+            fingerprints[stage.name] = manifest.stage_record(stage.name).get("fingerprint")
+            return "resumed", time.perf_counter() - start
+        try:
+            own_fingerprint = stage.fingerprint(context) if stage.fingerprint else None
+        except Exception as e:
+            print(f"Could not fingerprint stage '{stage.name}': {e}")
+            own_fingerprint = None
+        fingerprint = None
+        if own_fingerprint is not None:
+            fingerprint = hash_values([own_fingerprint] + [fingerprints.get(name) for name in stage.depends_on])
+        fingerprints[stage.name] = fingerprint
+
+        if not force and fingerprint is not None and state.get(stage.name) == fingerprint:
+            return "skipped", time.perf_counter() - start
+
+        print(f"Running {stage.name}...")
+        if manifest is not None:
+            manifest.mark_stage(stage.name, "running")
+        stage.run(context)
+        return "ran", time.perf_counter() - start
+
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            # Submit every stage whose dependencies are done; drop stages whose dependencies failed
+            for stage in list(pending):
+                dependency_outcomes = [outcomes.get(name) for name in stage.depends_on]
+                if "failed" in dependency_outcomes or "blocked" in dependency_outcomes:
+                    pending.remove(stage)
+                    outcomes[stage.name] = "blocked"
+                    timings[stage.name] = 0.0
+                    print(f"Not running {stage.name}: a dependency failed.")
+                elif all(outcome in succeeded for outcome in dependency_outcomes):
+                    pending.remove(stage)
+                    running[executor.submit(execute, stage)] = (stage, time.perf_counter())
+
+            if not running:
+                if pending:
+                    raise ValueError(f"Dependency cycle between stages: {[stage.name for stage in pending]}")
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, submitted = running.pop(future)
+                try:
+                    outcomes[stage.name], timings[stage.name] = future.result()
+                except Exception as e:
+                    outcomes[stage.name] = "failed"
+                    timings[stage.name] = time.perf_counter() - submitted
+                    print(f"Error while running {stage.name}: {e}")
+                    if manifest is not None:
+                        manifest.mark_stage(stage.name, "failed", error=str(e))
+                    continue
+                if manifest is not None and outcomes[stage.name] != "resumed":
+                    manifest.mark_stage(stage.name, "done", fingerprint=fingerprints.get(stage.name))
+                if fingerprints.get(stage.name) is not None:
+                    state[stage.name] = fingerprints[stage.name]
+                    save_state(state_path, state)
+
+    # Per-stage timings
+    print("\nStage timings:")
+    for stage in stages:
+        print(f"  {stage.name:<24} {outcomes[stage.name]:<8} {timings[stage.name]:8.2f}s")
+
+    all_succeeded = all(outcome in succeeded for outcome in outcomes.values())
+    if manifest is not None and all_succeeded:
+        manifest.finish()
+    return all_succeeded
 
 if __name__ == "__main__":
-    # Define the paths to the scripts
-    scripts = [
-        'data_handle/datatransfer_gcpbucket.py',
-        'data_handle/json_csv_gaia.py',
-        'data_handle/datatransfer_gcpsql.py',
-        'data_handle/source_text_extract.py',
-    ]
-    
-    # Run the scripts in order
-    for script in scripts:
-        run_script(script)
\ No newline at end of file
+    # Pass --force to run every stage even when its inputs are unchanged, and --resume to continue an
+    # interrupted run: stages and files it already completed are not redone
+    manifest = RunManifest(resume='--resume' in sys.argv)
+    context = PipelineContext(datatransfer_gcpbucket.BUCKET_NAME, manifest=manifest)
+    try:
+        succeeded = run_pipeline(build_stages(), context, force='--force' in sys.argv)
+    finally:
+        context.close()
+    if not succeeded:
+        sys.exit(1)
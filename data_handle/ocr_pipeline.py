@@ -0,0 +1,88 @@
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytesseract
+from PIL import Image, ImageOps
+
+# Resolution tesseract works best at; higher-DPI scans are downscaled to it
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", 300))
+
+# Cap on the number of pixels handed to tesseract; larger images are downscaled to fit
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", 4_000_000))
+
+# Number of images recognised concurrently (each one runs in its own tesseract process)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", os.cpu_count() or 1))
+
+# Extensions handled by the OCR pipeline
+OCR_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# Function to normalise an image before recognition: apply EXIF orientation, convert to grayscale,
+# resize high-DPI scans to OCR_TARGET_DPI and cap the total pixel count at OCR_MAX_PIXELS.
+# Returns the processed image and the DPI to report to tesseract (None when unknown).
+def preprocess_image(img):
+    dpi = img.info.get("dpi", (None, None))[0]
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("L")
+
+    scale = 1.0
+    if dpi and dpi > OCR_TARGET_DPI:
+        scale = OCR_TARGET_DPI / dpi
+    width, height = img.size
+    if width * height * scale * scale > OCR_MAX_PIXELS:
+        scale = math.sqrt(OCR_MAX_PIXELS / (width * height))
+
+    if scale < 1.0:
+        img = img.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+        if dpi:
+            dpi = dpi * scale
+    return img, (int(round(dpi)) if dpi else None)
+
+# Function to rebuild plain text from tesseract word data, keeping its line and paragraph breaks
+def words_to_text(data):
+    lines = []
+    current_key = None
+    current_paragraph = None
+    for index, word in enumerate(data["text"]):
+        if not word.strip():
+            continue
+        paragraph = (data["block_num"][index], data["par_num"][index])
+        key = paragraph + (data["line_num"][index],)
+        if key != current_key:
+            if current_paragraph is not None and paragraph != current_paragraph:
+                lines.append("")
+            lines.append(word)
+            current_key = key
+            current_paragraph = paragraph
+        else:
+            lines[-1] += " " + word
+    return "\n".join(lines)
+
+# Function to run OCR on a single image and return its text, mean word confidence and timing
+def ocr_image(file_path):
+    start = time.perf_counter()
+    result = {"file_path": file_path, "text": "", "confidence": None, "seconds": 0.0, "error": None}
+    try:
+        with Image.open(file_path) as img:
+            result["original_size"] = img.size
+            processed, dpi = preprocess_image(img)
+        result["processed_size"] = processed.size
+        config = f"--dpi {dpi}" if dpi else ""
+        data = pytesseract.image_to_data(processed, config=config, output_type=pytesseract.Output.DICT)
+        confidences = [float(conf) for conf, word in zip(data["conf"], data["text"]) if word.strip() and float(conf) >= 0]
+        result["text"] = words_to_text(data)
+        result["confidence"] = sum(confidences) / len(confidences) if confidences else None
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+# Function to run OCR on a batch of images across a pool of workers, returning results in input order
+def ocr_images(file_paths, workers=OCR_WORKERS):
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(ocr_image, file_paths))
+    for result in results:
+        confidence = "n/a" if result["confidence"] is None else f"{result['confidence']:.1f}"
+        print(f"OCR {os.path.basename(result['file_path'])}: {result['seconds']:.2f}s, confidence {confidence}")
+    return results
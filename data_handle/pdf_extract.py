@@ -0,0 +1,77 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PyPDF2 import PdfReader
+
+# Number of worker processes a single large PDF is split across (1 keeps page extraction in-process)
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", 1))
+
+# PDFs with fewer pages than this are never split across workers
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 50))
+
+# Optional caps on the number of pages and characters extracted from one PDF (0 means no cap)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", 0)) or None
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", 0)) or None
+
+# Function to count the pages of a PDF
+def count_pdf_pages(file_path):
+    with open(file_path, 'rb') as file:
+        return len(PdfReader(file).pages)
+
+# Function to yield (page_number, text, seconds) for the pages in [start, stop) of a PDF, one page at a time
+def iter_pdf_pages(file_path, start=0, stop=None):
+    with open(file_path, 'rb') as file:
+        reader = PdfReader(file)
+        page_count = len(reader.pages)
+        stop = page_count if stop is None else min(stop, page_count)
+        for page_number in range(start, stop):
+            page_start = time.perf_counter()
+            text = reader.pages[page_number].extract_text() or ""
+            yield page_number, text, time.perf_counter() - page_start
+
+# Function to extract a whole page range (runs inside worker processes)
+def extract_pdf_page_range(file_path, start, stop):
+    return list(iter_pdf_pages(file_path, start, stop))
+
+# Function to yield pages of a large PDF in order while page ranges are extracted by a process pool
+def iter_pdf_pages_parallel(file_path, page_count, workers):
+    range_size = -(-page_count // (workers * 4))  # a few ranges per worker to even out slow pages
+    ranges = [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(extract_pdf_page_range, file_path, start, stop) for start, stop in ranges]
+        for future in futures:
+            yield from future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+# Function to extract the text of a PDF page by page.
+# Pages are joined once at the end instead of growing one string, extraction stops at max_pages/max_chars,
+# PDFs with at least PDF_PARALLEL_MIN_PAGES pages are split across `workers` processes, and the time spent
+# on every page is appended to `page_timings` as (page_number, seconds) when a list is given.
+def extract_pdf_text(file_path, max_pages=PDF_MAX_PAGES, max_chars=PDF_MAX_CHARS, workers=PDF_PAGE_WORKERS, page_timings=None):
+    page_count = count_pdf_pages(file_path)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+
+    if workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+        pages = iter_pdf_pages_parallel(file_path, page_count, workers)
+    else:
+        pages = iter_pdf_pages(file_path, 0, page_count)
+
+    pieces = []
+    chars = 0
+    try:
+        for page_number, text, seconds in pages:
+            if page_timings is not None:
+                page_timings.append((page_number, seconds))
+            piece = text + "\n"
+            if max_chars is not None and chars + len(piece) > max_chars:
+                pieces.append(piece[:max_chars - chars])
+                break
+            pieces.append(piece)
+            chars += len(piece)
+    finally:
+        pages.close()
+    return "".join(pieces)
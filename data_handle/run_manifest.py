@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+# Where the manifest of the current (or last interrupted) ingest run is kept
+RUN_MANIFEST_PATH = os.getenv("RUN_MANIFEST_PATH", "/tmp/gaia_run_manifest.json")
+
+
+# Function to build the checkpoint key of a local file; a file that changed since it was checkpointed
+# gets a different key and is processed again
+def file_checkpoint_key(file_path):
+    stat = os.stat(file_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class RunManifest:
+    """Checkpoints of one ingest run: which stages finished and which files each stage completed.
+
+    The manifest is a JSON file that is rewritten atomically after every checkpoint. With resume=True the
+    manifest of an interrupted run is picked up again so only the unfinished work is redone; otherwise (or
+    when the previous run finished) a new run is started.
+    """
+
+    def __init__(self, path=RUN_MANIFEST_PATH, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = self.load() if resume else None
+        if self.data is not None and self.data.get("finished_at") is None:
+            print(f"Resuming run {self.data['run_id']} from {self.path}.")
+        else:
+            if resume:
+                print("No interrupted run to resume; starting a new run.")
+            self.data = {"run_id": uuid.uuid4().hex, "started_at": time.time(), "finished_at": None, "stages": {}, "files": {}}
+            self.save()
+
+    @property
+    def run_id(self):
+        return self.data["run_id"]
+
+    # Function to read the manifest file (None when it is missing or unreadable)
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable run manifest: {e}")
+            return None
+
+    # Function to write the manifest atomically so an interrupted run never leaves a corrupt file
+    def save(self):
+        with self.lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.data, file, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    # Function to tell whether a stage completed in this run
+    def stage_done(self, stage):
+        return self.data["stages"].get(stage, {}).get("status") == "done"
+
+    # Function to return what was recorded for a stage (status, fingerprint, timestamps)
+    def stage_record(self, stage):
+        return self.data["stages"].get(stage, {})
+
+    # Function to record the status of a stage ("running", "done" or "failed") with optional details
+    def mark_stage(self, stage, status, **details):
+        with self.lock:
+            record = self.data["stages"].setdefault(stage, {})
+            record.update(details, status=status, updated_at=time.time())
+        self.save()
+
+    # Function to tell whether a file was completed by a stage under the same checkpoint key
+    def file_done(self, stage, file_name, key):
+        return self.data["files"].get(stage, {}).get(file_name) == key
+
+    # Function to checkpoint a batch of completed files (file name -> checkpoint key) for a stage
+    def mark_files_done(self, stage, keys):
+        if not keys:
+            return
+        with self.lock:
+            self.data["files"].setdefault(stage, {}).update(keys)
+        self.save()
+
+    # Function to mark the run as finished, so the next --resume starts a new run
+    def finish(self):
+        with self.lock:
+            self.data["finished_at"] = time.time()
+        self.save()
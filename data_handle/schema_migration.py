@@ -0,0 +1,128 @@
+from psycopg2 import sql
+
+# Tables of the GAIA schema: the validation metadata and the results the app records against it
+TABLE_NAME = 'validation'
+RESULTS_TABLE_NAME = 'gaia_benchmark_results'
+
+
+# Function to tell whether a table exists in the current schema
+def table_exists(cursor, table_name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (table_name,))
+    return cursor.fetchone()[0]
+
+# Function to tell whether a table already has a constraint of the given name
+def constraint_exists(cursor, table_name, constraint_name):
+    cursor.execute(
+        "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s;",
+        (table_name, constraint_name)
+    )
+    return cursor.fetchone() is not None
+
+# Function to key the validation table: drop rows that cannot be keyed, add the task_id primary key
+# and the level/file_name indexes
+def migrate_validation_table(cursor, table_name):
+    table = sql.Identifier(table_name)
+
+    cursor.execute(sql.SQL("DELETE FROM {table} WHERE task_id IS NULL;").format(table=table))
+    if cursor.rowcount:
+        print(f"Removed {cursor.rowcount} rows without a task_id from '{table_name}'.")
+
+    # Keep one row per task_id (rows loaded twice by earlier runs)
+    cursor.execute(sql.SQL("""
+        DELETE FROM {table} AS duplicate
+        USING {table} AS kept
+        WHERE duplicate.task_id = kept.task_id AND duplicate.ctid > kept.ctid;
+    """).format(table=table))
+    if cursor.rowcount:
+        print(f"Removed {cursor.rowcount} duplicate task_id rows from '{table_name}'.")
+
+    cursor.execute(
+        "SELECT 1 FROM pg_index WHERE indrelid = to_regclass(%s) AND indisprimary;",
+        (table_name,)
+    )
+    if cursor.fetchone() is None:
+        cursor.execute(sql.SQL("ALTER TABLE {table} ADD PRIMARY KEY (task_id);").format(table=table))
+        print(f"Added primary key (task_id) to '{table_name}'.")
+
+    for column in ['level', 'file_name']:
+        cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON {table} ({column});").format(
+            index=sql.Identifier(f"{table_name}_{column}_idx"),
+            table=table,
+            column=sql.Identifier(column)
+        ))
+
+# Function to make the results table reference validation.task_id: add the column, backfill it for existing
+# results by matching the question text, then add the foreign key and the (task_id, result) index
+def migrate_results_table(cursor, results_table_name, validation_table_name):
+    results = sql.Identifier(results_table_name)
+    validation = sql.Identifier(validation_table_name)
+
+    cursor.execute(sql.SQL("ALTER TABLE {results} ADD COLUMN IF NOT EXISTS task_id VARCHAR(255);").format(results=results))
+
+    # Only questions that identify exactly one task are backfilled
+    cursor.execute(sql.SQL("""
+        UPDATE {results} AS result
+        SET task_id = task.task_id
+        FROM (
+            SELECT question, MIN(task_id) AS task_id
+            FROM {validation}
+            GROUP BY question
+            HAVING COUNT(*) = 1
+        ) AS task
+        WHERE result.task_id IS NULL AND result.question = task.question;
+    """).format(results=results, validation=validation))
+    print(f"Backfilled task_id for {cursor.rowcount} rows of '{results_table_name}'.")
+
+    cursor.execute(sql.SQL("SELECT COUNT(*) FROM {results} WHERE task_id IS NULL;").format(results=results))
+    unmatched = cursor.fetchone()[0]
+    if unmatched:
+        print(f"{unmatched} rows of '{results_table_name}' match no validation question and keep a NULL task_id.")
+
+    constraint_name = f"{results_table_name}_task_id_fkey"
+    if not constraint_exists(cursor, results_table_name, constraint_name):
+        cursor.execute(sql.SQL("""
+            ALTER TABLE {results}
+            ADD CONSTRAINT {constraint} FOREIGN KEY (task_id) REFERENCES {validation} (task_id) ON DELETE SET NULL;
+        """).format(results=results, constraint=sql.Identifier(constraint_name), validation=validation))
+        print(f"Added foreign key {constraint_name}.")
+
+    cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON {results} (task_id, result);").format(
+        index=sql.Identifier(f"{results_table_name}_task_id_result_idx"),
+        results=results
+    ))
+
+# Function to migrate both tables to the keyed schema in one transaction; safe to run repeatedly.
+# Returns True when the migration was committed.
+def migrate_schema(conn, table_name=TABLE_NAME, results_table_name=RESULTS_TABLE_NAME):
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        with conn:
+            with conn.cursor() as cursor:
+                if not table_exists(cursor, table_name):
+                    print(f"Table '{table_name}' does not exist yet; nothing to migrate.")
+                    return True
+                migrate_validation_table(cursor, table_name)
+                if table_exists(cursor, results_table_name):
+                    migrate_results_table(cursor, results_table_name, table_name)
+        print("Schema migration completed successfully.")
+        return True
+    except Exception as e:
+        print(f"Error migrating schema: {e}")
+        return False
+    finally:
+        conn.autocommit = autocommit
+
+if __name__ == "__main__":
+    import datatransfer_gcpsql
+
+    try:
+        conn = datatransfer_gcpsql.connect_to_db()
+    except Exception as e:
+        print(f"Error connecting to the database: {e}")
+        exit(1)
+    try:
+        if not migrate_schema(conn):
+            exit(1)
+    finally:
+        conn.close()
@@ -1,91 +1,86 @@
+import importlib
 import os
+import sys
+import uuid
 import zipfile
 import pandas as pd
-from PyPDF2 import PdfReader
-import docx
-import json
-import csv
-from PIL import Image
-import speech_recognition as sr
-import pytesseract
 import tempfile
-from pptx import Presentation
-from Bio import PDB
-from pydub import AudioSegment
+from extractor_registry import ExtractorRegistry
+from extraction_sandbox import ExtractionError
 
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2 import sql
 
+# Heavy, format-specific dependencies (PyPDF2, python-docx, openpyxl, xlrd, Pillow, pytesseract,
+# speech_recognition, pydub, python-pptx) are imported inside the extractors, so they are only loaded
+# once a file of that type is seen.
+# An extractor returns the text of a file and raises ExtractionError when it cannot produce any; the
+# status of a file is decided by that, never by what its text happens to start with.
+
 # Define the extraction functions for all supported file types
 def extract_text_from_pdf(file_path):
     try:
-        with open(file_path, 'rb') as file:
-            reader = PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+        from pdf_extract import extract_pdf_text
+        page_timings = []
+        text = extract_pdf_text(file_path, page_timings=page_timings)
+        if page_timings:
+            slowest_page, slowest_seconds = max(page_timings, key=lambda timing: timing[1])
+            total_seconds = sum(seconds for _, seconds in page_timings)
+            print(
+                f"Extracted {len(page_timings)} pages from {os.path.basename(file_path)} in {total_seconds:.2f}s "
+                f"(slowest page {slowest_page + 1}: {slowest_seconds:.2f}s)"
+            )
         return text
     except Exception as e:
-        return f"Error reading PDF file: {e}"
+        raise ExtractionError(f"Error reading PDF file: {e}") from e
 
 def extract_text_from_docx(file_path):
     try:
+        import docx
         doc = docx.Document(file_path)
         text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
         return text
     except Exception as e:
-        return f"Error reading DOCX file: {e}"
+        raise ExtractionError(f"Error reading DOCX file: {e}") from e
 
 def extract_text_from_excel(file_path):
     try:
-        df = pd.read_excel(file_path, engine='openpyxl')
-        text = df.to_string(index=False)
+        from spreadsheet_extract import extract_xlsx_text
+        text, _ = extract_xlsx_text(file_path)
         return text
     except Exception as e:
-        return f"Error reading Excel file: {e}. Make sure 'openpyxl' is installed."
+        raise ExtractionError(f"Error reading Excel file: {e}. Make sure 'openpyxl' is installed.") from e
 
 def extract_text_from_csv(file_path):
     try:
-        with open(file_path, 'r', newline='', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            text = "\n".join([", ".join(row) for row in reader])
+        from spreadsheet_extract import extract_csv_text
+        text, _ = extract_csv_text(file_path)
         return text
     except Exception as e:
-        return f"Error reading CSV file: {e}"
+        raise ExtractionError(f"Error reading CSV file: {e}") from e
 
 def extract_text_from_json(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            text = json.dumps(data, indent=4)
-        return text
+        from json_extract import extract_json_text
+        return extract_json_text(file_path)
     except Exception as e:
-        return f"Error reading JSON file: {e}"
+        raise ExtractionError(f"Error reading JSON file: {e}") from e
     
 def extract_text_from_jsonld(file_path):
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            text = json.dumps(data, indent=4)  # Format the JSON-LD data as a pretty-printed string
-        return text
+        from json_extract import extract_json_text
+        return extract_json_text(file_path)
     except Exception as e:
-        return f"Error reading JSON-LD file: {e}"    
+        raise ExtractionError(f"Error reading JSON-LD file: {e}") from e    
     
 # Function to extract text from .jsonl files
 def extract_text_from_jsonl(file_path):
     try:
-        text = ""
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                try:
-                    json_object = json.loads(line)
-                    text += json.dumps(json_object, indent=4) + "\n"
-                except json.JSONDecodeError as e:
-                    text += f"Invalid JSON in line: {line}\nError: {e}\n"
-        return text
+        from json_extract import extract_jsonl_text
+        return extract_jsonl_text(file_path)
     except Exception as e:
-        return f"Error reading JSONL file: {e}"
+        raise ExtractionError(f"Error reading JSONL file: {e}") from e
 
 def extract_text_from_txt(file_path):
     try:
@@ -93,50 +88,40 @@ def extract_text_from_txt(file_path):
             text = file.read()
         return text
     except Exception as e:
-        return f"Error reading TXT file: {e}"
+        raise ExtractionError(f"Error reading TXT file: {e}") from e
 
-def extract_text_from_image(file_path):
+# Function to run OCR on one image, returning the OCR result (text, mean word confidence, seconds)
+def ocr_image_result(file_path):
     try:
-        img = Image.open(file_path)
-        text = pytesseract.image_to_string(img)
-        return text
+        from ocr_pipeline import ocr_image
     except Exception as e:
-        return f"Error reading image file: {e}"
+        raise ExtractionError(f"Error reading image file: {e}") from e
+    result = ocr_image(file_path)
+    if result["error"] is not None:
+        raise ExtractionError(f"Error reading image file: {result['error']}")
+    return result
 
+def extract_text_from_image(file_path):
+    return ocr_image_result(file_path)["text"]
 
-# Convert any audio file format to WAV using pydub
-def convert_to_wav(audio_path):
-    audio_extension = os.path.splitext(audio_path)[1].lower()
-    if audio_extension != ".wav":
-        audio = AudioSegment.from_file(audio_path)
-        wav_path = audio_path.replace(audio_extension, ".wav")
-        audio.export(wav_path, format="wav")
-        return wav_path
-    return audio_path
 
-# Function to extract text from an audio file
+# Function to extract text from an audio file (any format ffmpeg can decode)
 def extract_text_from_audio(file_path):
     try:
-        # Convert to WAV format if not already in WAV
-        wav_path = convert_to_wav(file_path)
-
-        # Initialize recognizer
-        recognizer = sr.Recognizer()
-
-        # Use AudioFile to open and read the WAV file
-        with sr.AudioFile(wav_path) as source:
-            audio = recognizer.record(source)  # Record the entire file
-
-        # Recognize speech using Google Speech Recognition
-        text = recognizer.recognize_google(audio)
-        return text
-
-    except sr.UnknownValueError:
-        return "Google Speech Recognition could not understand the audio."
+        import speech_recognition as sr
+        from audio_transcription import get_recognizer, transcribe_audio
+    except Exception as e:
+        raise ExtractionError(f"Error processing audio file: {e}") from e
+    try:
+        recognizer = get_recognizer()
+        text = transcribe_audio(file_path, recognizer=recognizer)
     except sr.RequestError as e:
-        return f"Could not request results from Google Speech Recognition service; {e}"
+        raise ExtractionError(f"Could not request results from {recognizer.name} service; {e}") from e
     except Exception as e:
-        return f"Error processing audio file: {e}"
+        raise ExtractionError(f"Error processing audio file: {e}") from e
+    if not text:
+        raise ExtractionError(f"{recognizer.name} could not understand the audio.", status="no_speech")
+    return text
         
 
 
@@ -147,76 +132,144 @@ def extract_text_from_py(file_path):
             text = file.read()  # Read the entire Python file content
         return text
     except Exception as e:
-        return f"Error reading Python file: {e}"
+        raise ExtractionError(f"Error reading Python file: {e}") from e
     
-# Function to extract text from .wav (and other supported audio formats)
+# Function to extract text from .wav files (same chunked pipeline as the other audio formats)
 def extract_text_from_audio1(file_path):
-    try:
-        recognizer = sr.Recognizer()
-
-        # Use AudioFile to open and read the audio file
-        with sr.AudioFile(file_path) as source:
-            audio = recognizer.record(source)  # Record the entire file
-
-        # Recognize speech using Google Speech Recognition
-        text = recognizer.recognize_google(audio)
-        return text
-
-    except sr.UnknownValueError:
-        return "Google Speech Recognition could not understand the audio."
-    except sr.RequestError as e:
-        return f"Could not request results from Google Speech Recognition service; {e}"
-    except Exception as e:
-        return f"Error processing audio file: {e}"    
+    return extract_text_from_audio(file_path)
     
 def extract_text_from_pptx(file_path):
     try:
+        from pptx import Presentation
         prs = Presentation(file_path)
         text = "\n".join([shape.text for slide in prs.slides for shape in slide.shapes if hasattr(shape, "text")])
         return text
     except Exception as e:
-        return f"Error reading PPTX file: {e}"
+        raise ExtractionError(f"Error reading PPTX file: {e}") from e
+
+# Limits applied while reading ZIP archives: nesting depth, uncompressed size of a single member,
+# total uncompressed bytes read from one archive (nested archives included) and compression ratio
+ZIP_MAX_DEPTH = int(os.getenv("ZIP_MAX_DEPTH", 3))
+ZIP_MAX_MEMBER_BYTES = int(os.getenv("ZIP_MAX_MEMBER_BYTES", 200 * 1024 * 1024))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", 1024 * 1024 * 1024))
+ZIP_MAX_COMPRESSION_RATIO = int(os.getenv("ZIP_MAX_COMPRESSION_RATIO", 200))
+
+# Number of archive members extracted in parallel
+ZIP_MEMBER_WORKERS = int(os.getenv("ZIP_MEMBER_WORKERS", 4))
+
+# Function to copy one archive member out of the ZIP as a stream, enforcing the size limits on the bytes
+# actually decompressed (the sizes in the ZIP headers are not trusted)
+def stream_zip_member(zip_ref, info, destination, budget, chunk_size=1024 * 1024):
+    written = 0
+    with zip_ref.open(info) as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            written += len(chunk)
+            if written > ZIP_MAX_MEMBER_BYTES:
+                raise ValueError(f"member exceeds {ZIP_MAX_MEMBER_BYTES} bytes")
+            if written > budget[0]:
+                raise ValueError("archive exceeds its total decompression budget")
+            destination.write(chunk)
+    budget[0] -= written
+
+# Function to tell why an archive member must not be decompressed, based on its header (None if it is fine)
+def zip_member_limit_reason(info, budget):
+    if info.file_size > ZIP_MAX_MEMBER_BYTES:
+        return f"larger than {ZIP_MAX_MEMBER_BYTES} bytes"
+    if info.file_size > budget[0]:
+        return "over the archive decompression budget"
+    if info.compress_size and info.file_size / info.compress_size > ZIP_MAX_COMPRESSION_RATIO:
+        return f"compression ratio above {ZIP_MAX_COMPRESSION_RATIO}"
+    return None
+
+# Function to extract the text sections of all members of an open archive.
+# Unsupported members are skipped by extension before anything is decompressed, nested archives are
+# recursed into up to ZIP_MAX_DEPTH, and supported members are streamed to a scratch file and extracted
+# in parallel through the extract_functions registry. Sections are returned in archive order.
+def extract_zip_sections(zip_ref, depth, budget):
+    sections = []
+    jobs = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for index, info in enumerate(zip_ref.infolist()):
+            if info.is_dir():
+                continue
+            file = os.path.basename(info.filename)
+            file_ext = os.path.splitext(file)[1].lower()
+
+            if file_ext != ".zip" and file_ext not in extract_functions:
+                sections.append(f"\n\nUnsupported file in zip: {file}")
+                continue
+            limit_reason = zip_member_limit_reason(info, budget)
+            if limit_reason is not None:
+                sections.append(f"\n\nSkipped file in zip ({limit_reason}): {file}")
+                continue
+
+            if file_ext == ".zip":
+                if depth >= ZIP_MAX_DEPTH:
+                    sections.append(f"\n\nSkipped nested zip (depth limit {ZIP_MAX_DEPTH}): {file}")
+                    continue
+                try:
+                    with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as nested_file:
+                        stream_zip_member(zip_ref, info, nested_file, budget)
+                        nested_file.seek(0)
+                        with zipfile.ZipFile(nested_file) as nested_zip:
+                            sections.append(f"\n\nExtracted from {file}:\n\n")
+                            sections.extend(extract_zip_sections(nested_zip, depth + 1, budget))
+                except Exception as e:
+                    sections.append(f"\n\nError reading nested zip {file}: {e}")
+                continue
+
+            member_path = os.path.join(temp_dir, f"{index}{file_ext}")
+            try:
+                with open(member_path, 'wb') as member_file:
+                    stream_zip_member(zip_ref, info, member_file, budget)
+            except Exception as e:
+                sections.append(f"\n\nSkipped file in zip ({e}): {file}")
+                continue
+            jobs.append((len(sections), file, file_ext, member_path))
+            sections.append(None)
+
+        # Function to extract one member; a member that fails is described in the archive's text
+        def extract_member(job):
+            try:
+                return extract_functions[job[2]](job[3])
+            except Exception as e:
+                return str(e)
+
+        # Extract the supported members in parallel
+        with ThreadPoolExecutor(max_workers=max(1, ZIP_MEMBER_WORKERS)) as executor:
+            texts = executor.map(extract_member, jobs)
+            for (position, file, _, _), member_text in zip(jobs, texts):
+                sections[position] = f"\n\nExtracted from {file}:\n\n" + member_text
+    return sections
 
 def extract_text_from_zip(file_path):
     try:
-        text = ""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                zip_ref.extractall(temp_dir)
-                for root, _, files in os.walk(temp_dir):
-                    for file in files:
-                        file_full_path = os.path.join(root, file)
-                        file_ext = os.path.splitext(file_full_path)[1].lower()
-                        if file_ext in extract_functions:
-                            text += f"\n\nExtracted from {file}:\n\n" + extract_functions[file_ext](file_full_path)
-                        else:
-                            text += f"\n\nUnsupported file in zip: {file}"
-        return text
+        with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            sections = extract_zip_sections(zip_ref, depth=0, budget=[ZIP_MAX_TOTAL_BYTES])
+        return "".join(sections)
     except Exception as e:
-        return f"Error reading ZIP file: {e}"
+        raise ExtractionError(f"Error reading ZIP file: {e}") from e
       
     
 # Function to extract text from .xml files
 def extract_text_from_xml(file_path):
     try:
+        import xml.etree.ElementTree as ET
         tree = ET.parse(file_path)
         root = tree.getroot()
         text = ET.tostring(root, encoding='unicode', method='xml')
         return text
     except Exception as e:
-        return f"Error reading XML file: {e}"
+        raise ExtractionError(f"Error reading XML file: {e}") from e
 
-# Function to extract text from .xls files (using pandas)
+# Function to extract text from .xls files (streamed sheet by sheet with xlrd)
 def extract_text_from_xls(file_path):
     try:
-        df = pd.read_excel(file_path, sheet_name=None)  # Read all sheets into a dictionary
-        text = ""
-        for sheet_name, sheet_df in df.items():
-            text += f"Sheet: {sheet_name}\n"
-            text += sheet_df.to_string(index=False) + "\n\n"  # Convert each sheet to a string
+        from spreadsheet_extract import extract_xls_text
+        text, _ = extract_xls_text(file_path)
         return text
     except Exception as e:
-        return f"Error reading XLS file: {e}. Make sure 'xlrd' is installed."    
+        raise ExtractionError(f"Error reading XLS file: {e}. Make sure 'xlrd' is installed.") from e    
 
 def extract_text_from_pdb(file_path):
     with open(file_path, 'r') as file:
@@ -224,43 +277,135 @@ def extract_text_from_pdb(file_path):
     return pdb_text
 
 
+import json
 import tempfile
 import os
-from google.cloud import storage
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 import pandas as pd
 import psycopg2
 from psycopg2 import sql
 from dotenv import load_dotenv
+from extraction_cache import ExtractionCache, declare_extractor_dependencies
+from extraction_sandbox import SandboxPool, extraction_result
+from extraction_metrics import finish_measurement, metrics_row, print_metrics_report, start_measurement, write_metrics
+from gcs_utils import get_bucket
+from run_manifest import RunManifest, file_checkpoint_key
+from db_bulk import COPY_BATCH_SIZE, copy_dataframe, notify_table_changed
+
+# What the output of the built-in extractors depends on besides their own code, folded into the version
+# the extraction cache and the stage fingerprints key on
+PDF_SETTINGS = ["PDF_MAX_PAGES", "PDF_MAX_CHARS"]
+SHEET_SETTINGS = ["SHEET_MAX_ROWS", "SHEET_MAX_COLS", "SHEET_MAX_CHARS"]
+JSON_SETTINGS = ["JSON_OUTPUT_MODE", "JSON_MAX_CHARS"]
+OCR_SETTINGS = ["OCR_TARGET_DPI", "OCR_MAX_PIXELS"]
+TRANSCRIPTION_SETTINGS = [
+    "TRANSCRIPTION_BACKEND", "TRANSCRIPTION_STUB_TEXT", "TRANSCRIPTION_MIN_SILENCE_MS",
+    "TRANSCRIPTION_SILENCE_THRESHOLD_DB", "TRANSCRIPTION_MAX_SEGMENT_MS",
+]
+ZIP_SETTINGS = ["ZIP_MAX_DEPTH", "ZIP_MAX_MEMBER_BYTES", "ZIP_MAX_TOTAL_BYTES", "ZIP_MAX_COMPRESSION_RATIO"]
+
+declare_extractor_dependencies(extract_text_from_pdf, ["pdf_extract"], PDF_SETTINGS)
+declare_extractor_dependencies(extract_text_from_excel, ["spreadsheet_extract"], SHEET_SETTINGS)
+declare_extractor_dependencies(extract_text_from_xls, ["spreadsheet_extract"], SHEET_SETTINGS)
+declare_extractor_dependencies(extract_text_from_csv, ["spreadsheet_extract"], SHEET_SETTINGS)
+declare_extractor_dependencies(extract_text_from_json, ["json_extract"], JSON_SETTINGS)
+declare_extractor_dependencies(extract_text_from_jsonld, ["json_extract"], JSON_SETTINGS)
+declare_extractor_dependencies(extract_text_from_jsonl, ["json_extract"], JSON_SETTINGS)
+declare_extractor_dependencies(extract_text_from_image, ["ocr_pipeline"], OCR_SETTINGS, [ocr_image_result])
+declare_extractor_dependencies(extract_text_from_audio, ["audio_transcription"], TRANSCRIPTION_SETTINGS)
+declare_extractor_dependencies(extract_text_from_audio1, extractors=[extract_text_from_audio])
+# Archive members go through the other built-in extractors, and stream_zip_member/extract_zip_sections
+declare_extractor_dependencies(
+    extract_text_from_zip,
+    settings=ZIP_SETTINGS,
+    extractors=[
+        stream_zip_member, zip_member_limit_reason, extract_zip_sections, extract_text_from_pdf,
+        extract_text_from_docx, extract_text_from_excel, extract_text_from_csv, extract_text_from_json,
+        extract_text_from_jsonld, extract_text_from_jsonl, extract_text_from_txt, extract_text_from_image,
+        extract_text_from_audio, extract_text_from_audio1, extract_text_from_py, extract_text_from_pptx,
+        extract_text_from_xml, extract_text_from_xls, extract_text_from_pdb,
+    ]
+)
+
+# Registry of extractors by file type. Files are dispatched by sniffed MIME type, falling back to the
+# extension; third parties can add or replace extractors with register_extractor, passing either a
+# function or a lazily imported "module:function" string.
+extractor_registry = ExtractorRegistry()
+
+def register_extractor(file_type, extractor, extensions=(), mime_types=()):
+    extractor_registry.register(file_type, extractor, extensions=extensions, mime_types=mime_types)
 
-# Define your extraction functions here (e.g., extract_text_from_pdf, etc.)
-# (Omitting function definitions for brevity, include them as defined earlier)
-
-# Mapping extensions to their respective extraction functions
-extract_functions = {
-    ".pdf": extract_text_from_pdf,
-    ".docx": extract_text_from_docx,
-    ".xlsx": extract_text_from_excel,
-    ".csv": extract_text_from_csv,
-    ".json": extract_text_from_json,
-    ".jsonld": extract_text_from_jsonld,
-    ".jsonl": extract_text_from_jsonl,
-    ".txt": extract_text_from_txt,
-    ".jpg": extract_text_from_image,
-    ".jpeg": extract_text_from_image,
-    ".png": extract_text_from_image,
-    ".py": extract_text_from_py,
-    ".pptx": extract_text_from_pptx,
-    ".mp3": extract_text_from_audio,
-    ".wav": extract_text_from_audio1,
-    ".zip": extract_text_from_zip,
-    ".xls": extract_text_from_xls,
-    ".xml": extract_text_from_xml,
-    ".pdb": extract_text_from_pdb
+register_extractor("pdf", extract_text_from_pdf, [".pdf"], ["application/pdf"])
+register_extractor("docx", extract_text_from_docx, [".docx"],
+                   ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"])
+register_extractor("xlsx", extract_text_from_excel, [".xlsx"],
+                   ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"])
+register_extractor("csv", extract_text_from_csv, [".csv"])
+register_extractor("json", extract_text_from_json, [".json"])
+register_extractor("jsonld", extract_text_from_jsonld, [".jsonld"])
+register_extractor("jsonl", extract_text_from_jsonl, [".jsonl"])
+register_extractor("txt", extract_text_from_txt, [".txt"])
+register_extractor("image", extract_text_from_image, [".jpg", ".jpeg", ".png"], ["image/jpeg", "image/png"])
+register_extractor("py", extract_text_from_py, [".py"])
+register_extractor("pptx", extract_text_from_pptx, [".pptx"],
+                   ["application/vnd.openxmlformats-officedocument.presentationml.presentation"])
+register_extractor("mp3", extract_text_from_audio, [".mp3"], ["audio/mpeg"])
+register_extractor("wav", extract_text_from_audio1, [".wav"], ["audio/wav"])
+register_extractor("zip", extract_text_from_zip, [".zip"], ["application/zip"])
+register_extractor("xls", extract_text_from_xls, [".xls"], ["application/vnd.ms-excel"])
+register_extractor("xml", extract_text_from_xml, [".xml"], ["application/xml"])
+register_extractor("pdb", extract_text_from_pdb, [".pdb"])
+
+# Mapping extensions to their respective extraction functions (a live view of the registry)
+extract_functions = extractor_registry.by_extension()
+
+# Relative cost of extracting one byte of each file type, used to schedule the most expensive files first.
+# OCR and speech recognition dominate, followed by PDF parsing and the spreadsheet/archive formats.
+extraction_cost_weights = {
+    ".mp3": 20,
+    ".wav": 10,
+    ".jpg": 8,
+    ".jpeg": 8,
+    ".png": 8,
+    ".pdf": 4,
+    ".zip": 3,
+    ".xlsx": 3,
+    ".xls": 3,
+    ".pptx": 2,
+    ".docx": 2,
 }
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Load extractor plugins: EXTRACTOR_PLUGINS is a comma-separated list of modules, each defining
+# register_extractors(register) which calls register(file_type, extractor, extensions, mime_types)
+for plugin_module in filter(None, (name.strip() for name in os.getenv("EXTRACTOR_PLUGINS", "").split(","))):
+    importlib.import_module(plugin_module).register_extractors(register_extractor)
+
+# Number of worker processes used for text extraction (1 keeps the serial behaviour)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 1))
+
+# Files submitted to the workers at once (0 means twice the number of workers)
+EXTRACTION_MAX_IN_FLIGHT = int(os.getenv("EXTRACTION_MAX_IN_FLIGHT", 0))
+
+# Run every extraction in a resource-limited sandbox worker (see extraction_sandbox for the limits)
+EXTRACTION_SANDBOX = os.getenv("EXTRACTION_SANDBOX", "1") == "1"
+
+# Stream extraction results to the database in batches as they complete (0 extracts everything first)
+EXTRACTION_STREAMING = os.getenv("EXTRACTION_STREAMING", "1") == "1"
+
+# A streamed batch is written once it holds this many files or this many characters of extracted text
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", 50))
+STREAM_BATCH_CHARS = int(os.getenv("STREAM_BATCH_CHARS", 20_000_000))
+
+# Record per-file telemetry (time, CPU, memory, sizes, status) in the extraction_metrics table
+EXTRACTION_METRICS = os.getenv("EXTRACTION_METRICS", "1") == "1"
+
+# Directory of the persistent extraction cache (set to an empty value to disable caching)
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "/tmp/extraction_cache")
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
 # Load database configuration from environment variables
 db_host = os.getenv("DB_HOST")
 db_port = os.getenv("DB_PORT")
@@ -338,12 +483,97 @@ def update_table_with_source_text(conn, df, table_name):
     except Exception as e:
         print(f"Error updating table: {e}")
 
-# Function to download all files from GCP bucket to a specific local directory
-def download_files_to_directory(bucket_name, local_directory):
+# Name of the local manifest recording the generation/crc32c of every synced blob
+SYNC_MANIFEST_NAME = ".gcs_manifest.json"
+
+# Number of concurrent downloads used by the sync mode
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 8))
+
+# Number of downloads between two checkpoints of the sync manifest
+SYNC_CHECKPOINT_FILES = int(os.getenv("SYNC_CHECKPOINT_FILES", 25))
+
+# Function to load the local sync manifest (blob name -> generation, crc32c, size)
+def load_sync_manifest(local_directory):
+    manifest_path = os.path.join(local_directory, SYNC_MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Ignoring unreadable sync manifest: {e}")
+        return {}
+
+# Function to save the sync manifest atomically so an interrupted run never leaves a corrupt file
+def save_sync_manifest(local_directory, manifest):
+    manifest_path = os.path.join(local_directory, SYNC_MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+# Function to update the table with source text in one set-based statement.
+# The extracted texts are COPYed into a temporary staging table and applied with a single UPDATE ... FROM
+# join on file_name, which is indexed on both sides, all inside one transaction. Returns True on commit.
+def bulk_update_table_with_source_text(conn, df, table_name, batch_size=COPY_BATCH_SIZE):
+    staging_df = df.rename(columns={
+        'File_name': 'file_name',
+        'Extracted Text': 'source_text',
+        'Status': 'extraction_status',
+        'Error': 'extraction_error'
+    })
+    columns = [column for column in ['file_name', 'source_text', 'extraction_status', 'extraction_error'] if column in staging_df]
+    autocommit = conn.autocommit
+    conn.autocommit = False
+    try:
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON {table} (file_name);").format(
+                    index=sql.Identifier(f"{table_name}_file_name_idx"),
+                    table=sql.Identifier(table_name)
+                ))
+                cursor.execute("""
+                    CREATE TEMP TABLE source_text_staging (
+                        file_name VARCHAR(255),
+                        source_text TEXT,
+                        extraction_status TEXT,
+                        extraction_error TEXT
+                    ) ON COMMIT DROP;
+                """)
+                copy_dataframe(cursor, staging_df, "source_text_staging", columns, batch_size=batch_size)
+                cursor.execute("CREATE INDEX ON source_text_staging (file_name);")
+                cursor.execute("ANALYZE source_text_staging;")
+                cursor.execute(sql.SQL("""
+                    UPDATE {table} AS target
+                    SET {assignments}
+                    FROM source_text_staging AS staging
+                    WHERE target.file_name = staging.file_name;
+                """).format(
+                    table=sql.Identifier(table_name),
+                    assignments=sql.SQL(', ').join(
+                        sql.SQL("{column} = staging.{column}").format(column=sql.Identifier(column))
+                        for column in columns if column != 'file_name'
+                    )
+                ))
+                updated_rows = cursor.rowcount
+                notify_table_changed(cursor, table_name)
+        print(f"Table '{table_name}' updated successfully with source text ({updated_rows} rows).")
+        return True
+    except Exception as e:
+        print(f"Error updating table: {e}")
+        return False
+    finally:
+        conn.autocommit = autocommit
+
+# Function to download all files from GCP bucket to a specific local directory.
+# With sync=True only new or changed blobs are fetched (see sync_files_to_directory).
+def download_files_to_directory(bucket_name, local_directory, sync=False, max_workers=DOWNLOAD_WORKERS, bucket=None):
+    if sync:
+        return sync_files_to_directory(bucket_name, local_directory, max_workers=max_workers, bucket=bucket)
     try:
         # Initialize the Google Cloud Storage client
-        client = storage.Client()
-        bucket = client.bucket(bucket_name)
+        if bucket is None:
+            bucket = get_bucket(bucket_name)
         
         # Create local directory if it doesn't exist
         if not os.path.exists(local_directory):
@@ -369,62 +599,434 @@ def download_files_to_directory(bucket_name, local_directory):
     except Exception as e:
         print(f"Error downloading files from GCS: {e}")
 
-# Function to extract text from a given directory of files (already defined by you)
-def extract_text_from_directory(directory_path):
-    # Files to ignore
-    files_to_ignore = {"metadata.jsonl", "metadata.csv", ".DS_Store"}
-    
-    extracted_texts = {}
-    if os.path.isdir(directory_path):
-        for file_name in os.listdir(directory_path):
-            # Skip files in the ignore list
-            if file_name in files_to_ignore:
+# Function to incrementally sync a bucket into a local directory.
+# A local manifest keeps the generation and crc32c of every downloaded blob; blobs whose generation and
+# checksum are unchanged (and whose local copy is still present) are skipped, the rest are fetched
+# through a bounded pool of concurrent downloads. Returns the fetched/skipped counts and byte totals.
+def sync_files_to_directory(bucket_name, local_directory, max_workers=DOWNLOAD_WORKERS, bucket=None):
+    stats = {"fetched_files": 0, "fetched_bytes": 0, "skipped_files": 0, "skipped_bytes": 0, "failed_files": 0}
+    try:
+        if bucket is None:
+            bucket = get_bucket(bucket_name)
+
+        # Create local directory if it doesn't exist
+        if not os.path.exists(local_directory):
+            os.makedirs(local_directory)
+            print(f"Directory '{local_directory}' created.")
+
+        manifest = load_sync_manifest(local_directory)
+        new_manifest = {}
+        to_fetch = []
+
+        # Diff the bucket listing against the manifest
+        for blob in bucket.list_blobs():
+            if blob.name.endswith("/"):
                 continue
-            
-            file_path = os.path.join(directory_path, file_name)
-            file_extension = os.path.splitext(file_path)[1].lower()
-            if file_extension in extract_functions:
-                extracted_texts[file_name] = extract_functions[file_extension](file_path)
+            local_file_path = os.path.join(local_directory, os.path.basename(blob.name))
+            entry = manifest.get(blob.name)
+            unchanged = (
+                entry is not None
+                and entry.get("generation") == blob.generation
+                and entry.get("crc32c") == blob.crc32c
+                and os.path.exists(local_file_path)
+                and os.path.getsize(local_file_path) == blob.size
+            )
+            if unchanged:
+                new_manifest[blob.name] = entry
+                stats["skipped_files"] += 1
+                stats["skipped_bytes"] += blob.size or 0
             else:
-                extracted_texts[file_name] = f"Unsupported file type: {file_extension}"
-    else:
-        return pd.DataFrame()  # Return an empty DataFrame if the directory is invalid
+                to_fetch.append((blob, local_file_path))
 
-    # Convert results to a DataFrame
-    return pd.DataFrame(list(extracted_texts.items()), columns=['File_name', 'Extracted Text'])
+        # Function to download a single blob (runs in the download pool); the file is downloaded next to
+        # its destination and renamed into place, so an interrupted download never looks complete
+        def fetch(blob, local_file_path):
+            partial_path = local_file_path + ".part"
+            try:
+                blob.download_to_filename(partial_path)
+                os.replace(partial_path, local_file_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            return blob
 
-# Main workflow function
-def main_workflow(bucket_name, table_name):
-    # Define the local directory for downloading files
-    local_dir = '/tmp/validation'  # Local path for downloaded files
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch, blob, path): (blob, path) for blob, path in to_fetch}
+            for future in as_completed(futures):
+                blob, local_file_path = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    stats["failed_files"] += 1
+                    print(f"Error downloading {blob.name}: {e}")
+                    continue
+                new_manifest[blob.name] = {"generation": blob.generation, "crc32c": blob.crc32c, "size": blob.size}
+                stats["fetched_files"] += 1
+                stats["fetched_bytes"] += blob.size or 0
+                print(f"Downloaded {blob.name} to {local_file_path}")
+                # Checkpoint the manifest now and then so an interrupted sync keeps the files it fetched
+                if stats["fetched_files"] % SYNC_CHECKPOINT_FILES == 0:
+                    save_sync_manifest(local_directory, {**manifest, **new_manifest})
 
-    # Step 1: Download files from GCP bucket to the local directory
-    download_files_to_directory(bucket_name, local_dir)
+        save_sync_manifest(local_directory, new_manifest)
+        print(
+            f"Sync complete: fetched {stats['fetched_files']} files ({stats['fetched_bytes']} bytes), "
+            f"skipped {stats['skipped_files']} unchanged files ({stats['skipped_bytes']} bytes), "
+            f"{stats['failed_files']} failed."
+        )
+    except Exception as e:
+        stats["error"] = str(e)
+        print(f"Error syncing files from GCS: {e}")
+    return stats
 
-    # Step 2: Connect to the database
-    conn = connect_to_db()
-    if not conn:
-        print("Failed to connect to the database.")
+# Function to estimate how expensive a file is to extract (file size weighted by file type)
+def estimate_extraction_cost(file_path):
+    file_extension = os.path.splitext(file_path)[1].lower()
+    try:
+        file_size = os.path.getsize(file_path)
+    except OSError:
+        file_size = 0
+    return file_size * extraction_cost_weights.get(file_extension, 1)
+
+# Function to extract text from a single file using the extractor registered for its (sniffed) type
+def extract_text_from_file(file_path):
+    extractor = extractor_registry.extractor_for(file_path)
+    if extractor is None:
+        raise ExtractionError(f"Unsupported file type: {os.path.splitext(file_path)[1].lower()}", status="unsupported")
+    return extractor(file_path)
+
+# Function to build the structured result of an image that was recognised successfully
+def ocr_extraction_result(ocr_result):
+    result = extraction_result("ok", text=ocr_result["text"], seconds=ocr_result.get("seconds", 0.0))
+    result["ocr_confidence"] = ocr_result.get("confidence")
+    result["ocr_seconds"] = ocr_result.get("seconds")
+    return result
+
+# Function to run OCR on a batch of images, importing the OCR pipeline only when there are images to process
+def ocr_image_batch(image_paths):
+    if not image_paths:
+        return []
+    try:
+        from ocr_pipeline import OCR_WORKERS, ocr_images
+    except Exception as e:
+        return [{"text": "", "error": str(e)} for _ in image_paths]
+    return ocr_images(image_paths, OCR_WORKERS)
+
+# Function to extract a single file into a structured result (runs inside pool and sandbox workers),
+# measuring wall time, CPU time and peak RSS around the extractor call. The status comes from how the
+# extractor finished: its text on success, the status of the ExtractionError it raised, or "error".
+# Images handled by the default OCR extractor also report their OCR confidence and time.
+def extract_file_result(file_path):
+    measurement = start_measurement()
+    try:
+        extractor = extractor_registry.extractor_for(file_path)
+        if extractor is extract_text_from_image:
+            result = ocr_extraction_result(ocr_image_result(file_path))
+        else:
+            result = extraction_result("ok", text=extract_text_from_file(file_path))
+    except MemoryError:
+        raise
+    except ExtractionError as e:
+        result = extraction_result(e.status, error=str(e))
+    except Exception as e:
+        result = extraction_result("error", error=f"Error extracting file: {e}")
+    result.update(finish_measurement(measurement))
+    return result
+
+# Function to list the files of a directory that should be extracted, in directory listing order
+def list_extraction_files(directory_path):
+    # Files to ignore
+    files_to_ignore = {"metadata.jsonl", "metadata.csv", ".DS_Store", SYNC_MANIFEST_NAME}
+
+    # Skip files in the ignore list, partial downloads left behind by an interrupted sync and
+    # temporary sync manifests left behind by a failed save
+    return [
+        file_name for file_name in os.listdir(directory_path)
+        if file_name not in files_to_ignore and not file_name.endswith((".part", ".tmp"))
+    ]
+
+# Function to extract the files of a directory, yielding (file_name, result) pairs as extractions complete.
+# With max_workers > 1 the files are spread over a process pool, largest and most expensive first,
+# so a single slow OCR image or long PDF does not hold up the rest of the directory.
+# With sandbox=True every file is extracted in a recycled worker process under a wall-clock timeout and
+# memory/CPU limits (see extraction_sandbox), so one pathological attachment cannot hang or kill the run.
+# When an ExtractionCache is given, files whose content and extractor are unchanged are served from it.
+# Files named in skip_files (e.g. already checkpointed by a resumed run) are left out.
+def iter_extracted_texts(directory_path, max_workers=1, cache=None, sandbox=False, skip_files=()):
+    if not os.path.isdir(directory_path):
         return
 
-    # Step 3: Add the 'source_text' column to the table
+    cache_keys = {}
+    pending = []
+    file_types = {}
+    for file_name in list_extraction_files(directory_path):
+        if file_name in skip_files:
+            continue
+        file_path = os.path.join(directory_path, file_name)
+        file_types[file_name] = extractor_registry.detect(file_path)
+        if cache is not None and file_types[file_name] is not None:
+            try:
+                cache_keys[file_name] = cache.key_for(file_path, extractor_registry.load(file_types[file_name]))
+            except OSError as e:
+                print(f"Error hashing {file_name} for the extraction cache: {e}")
+            else:
+                cached_text = cache.get(cache_keys[file_name])
+                if cached_text is not None:
+                    yield file_name, dict(extraction_result("ok", text=cached_text), cached=True, file_type=file_types[file_name])
+                    continue
+        pending.append(file_name)
+
+    # Store fresh results, leaving failures out so they are retried on the next run
+    def finish(file_name, result):
+        result["file_type"] = file_types[file_name]
+        if result["status"] != "ok":
+            print(f"Extraction of {file_name} failed ({result['status']}): {result['error']}")
+        elif cache is not None and file_name in cache_keys:
+            cache.put(cache_keys[file_name], result["text"])
+        return file_name, result
+
+    # Function to turn the OCR batch output into structured results
+    def image_results(ocr_results):
+        for file_name, result in zip(image_files, ocr_results):
+            if result["error"] is not None:
+                yield finish(file_name, extraction_result("error", error=f"Error reading image file: {result['error']}"))
+            else:
+                yield finish(file_name, ocr_extraction_result(result))
+
+    # Images handled by the default OCR extractor are recognised as one batch on a thread pool of tesseract
+    # processes, running alongside the extraction of the other files (in sandbox mode they go to the sandbox)
+    image_files = [
+        file_name for file_name in pending
+        if not sandbox and file_types[file_name] == "image" and extractor_registry.load("image") is extract_text_from_image
+    ]
+    other_files = [file_name for file_name in pending if file_name not in image_files]
+    ocr_executor = ThreadPoolExecutor(max_workers=1)
+    image_paths = [os.path.join(directory_path, file_name) for file_name in image_files]
+
+    # Schedule the most expensive files first so they do not end up as the long tail
+    scheduled = sorted(
+        other_files,
+        key=lambda name: estimate_extraction_cost(os.path.join(directory_path, name)),
+        reverse=True
+    )
+    try:
+        if sandbox or max_workers is None or max_workers > 1:
+            workers = max_workers or os.cpu_count() or 1
+            if sandbox:
+                executor = SandboxPool(extract_file_result, workers)
+                submit = executor.submit
+            else:
+                executor = ProcessPoolExecutor(max_workers=workers)
+                submit = lambda file_path: executor.submit(extract_file_result, file_path)
+            with executor:
+                # Only a bounded number of files is in flight: the next file is submitted as one completes,
+                # and finished futures are dropped once their result is taken, so extracted texts cannot
+                # pile up faster than the caller consumes them
+                remaining = iter(scheduled)
+                futures = {}
+
+                def submit_next():
+                    for file_name in remaining:
+                        futures[submit(os.path.join(directory_path, file_name))] = file_name
+                        return
+
+                for _ in range(max(1, EXTRACTION_MAX_IN_FLIGHT or 2 * workers)):
+                    submit_next()
+                # Start the OCR batch only once the worker processes have been forked
+                futures[ocr_executor.submit(ocr_image_batch, image_paths)] = None
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        file_name = futures.pop(future)
+                        if file_name is None:
+                            yield from image_results(future.result())
+                            continue
+                        submit_next()
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = extraction_result("error", error=f"Error extracting file: {e}")
+                        yield finish(file_name, result)
+                    del done
+        else:
+            ocr_future = ocr_executor.submit(ocr_image_batch, image_paths)
+            for file_name in scheduled:
+                yield finish(file_name, extract_file_result(os.path.join(directory_path, file_name)))
+            yield from image_results(ocr_future.result())
+    finally:
+        ocr_executor.shutdown()
+
+    if cache is not None:
+        print(f"Extraction cache: {cache.hits} hits, {cache.misses} misses.")
+
+# Function to extract text from a given directory of files (see iter_extracted_texts).
+# Returns File_name, Extracted Text (None when extraction failed), Status and Error columns.
+def extract_text_from_directory(directory_path, max_workers=1, cache=None, sandbox=False):
+    if not os.path.isdir(directory_path):
+        return pd.DataFrame()  # Return an empty DataFrame if the directory is invalid
+
+    results = dict(iter_extracted_texts(directory_path, max_workers=max_workers, cache=cache, sandbox=sandbox))
+
+    # Convert results to a DataFrame, keeping the directory listing order
+    return pd.DataFrame(
+        [
+            (file_name, result["text"], result["status"], result["error"])
+            for file_name, result in ((name, results[name]) for name in list_extraction_files(directory_path))
+        ],
+        columns=['File_name', 'Extracted Text', 'Status', 'Error']
+    )
+
+# Function to write extraction results to the table as they arrive, in batches bounded by row count
+# and by characters of text, so memory stays bounded and finished files show up in the table early.
+# A failed batch is reported and skipped; the returned stats count written and failed files.
+# on_batch_written, when given, is called with the file names of every batch that was committed.
+def stream_source_text_updates(conn, table_name, results, max_rows=STREAM_BATCH_ROWS, max_chars=STREAM_BATCH_CHARS,
+                               on_batch_written=None):
+    stats = {"batches": 0, "written_files": 0, "failed_files": 0}
+    batch = []
+    batch_chars = 0
+
+    def flush():
+        df = pd.DataFrame(batch, columns=['File_name', 'Extracted Text', 'Status', 'Error'])
+        stats["batches"] += 1
+        if bulk_update_table_with_source_text(conn, df, table_name):
+            stats["written_files"] += len(batch)
+            if on_batch_written is not None:
+                on_batch_written([row[0] for row in batch])
+        else:
+            stats["failed_files"] += len(batch)
+
+    for file_name, result in results:
+        batch.append((file_name, result["text"], result["status"], result["error"]))
+        batch_chars += len(result["text"] or "")
+        if len(batch) >= max_rows or batch_chars >= max_chars:
+            flush()
+            batch = []
+            batch_chars = 0
+    if batch:
+        flush()
+    return stats
+
+# Local path for downloaded files
+LOCAL_DIR = '/tmp/validation'
+
+# Function to store the metrics rows of a run and print the per-extension report
+def record_metrics(conn, rows):
+    if rows:
+        write_metrics(conn, rows)
+        print_metrics_report(pd.DataFrame(rows))
+
+# Function to pass extraction results through unchanged while recording a metrics row for each of them
+def collect_metrics(results, local_dir, run_id, rows):
+    for file_name, result in results:
+        rows.append(metrics_row(run_id, os.path.join(local_dir, file_name), result))
+        yield file_name, result
+
+# Name of the extraction stage in the run manifest
+EXTRACT_STAGE = "extract_source_text"
+
+# Function to update the source_text column from the files in the local directory.
+# With a RunManifest, every committed file is checkpointed and files already checkpointed in the run
+# (and unchanged since) are not extracted or written again.
+def update_source_text(conn, table_name, local_dir=LOCAL_DIR, manifest=None):
+    # Add the 'source_text' column to the table, plus the structured status of each extraction
     add_column_to_table(conn, table_name, "source_text", "TEXT")
+    add_column_to_table(conn, table_name, "extraction_status", "TEXT")
+    add_column_to_table(conn, table_name, "extraction_error", "TEXT")
+
+    checkpoint_keys = {}
+    skip_files = set()
+    if manifest is not None and os.path.isdir(local_dir):
+        for file_name in list_extraction_files(local_dir):
+            checkpoint_keys[file_name] = file_checkpoint_key(os.path.join(local_dir, file_name))
+            if manifest.file_done(EXTRACT_STAGE, file_name, checkpoint_keys[file_name]):
+                skip_files.add(file_name)
+        if skip_files:
+            print(f"Resuming: {len(skip_files)} files were already written in this run.")
+
+    # Function to checkpoint the files of a committed write
+    def checkpoint(file_names):
+        if manifest is not None:
+            manifest.mark_files_done(EXTRACT_STAGE, {name: checkpoint_keys[name] for name in file_names if name in checkpoint_keys})
+
+    # Per-file telemetry of this run, written to the extraction_metrics table at the end
+    metrics_rows = []
+    run_id = manifest.run_id if manifest is not None else uuid.uuid4().hex
+
+    # Extract text from files in the local directory, reusing cached text for unchanged files
+    cache = ExtractionCache(EXTRACTION_CACHE_DIR, max_bytes=EXTRACTION_CACHE_MAX_BYTES) if EXTRACTION_CACHE_DIR else None
+    try:
+        results = iter_extracted_texts(
+            local_dir, max_workers=EXTRACTION_WORKERS, cache=cache, sandbox=EXTRACTION_SANDBOX, skip_files=skip_files
+        )
+        if EXTRACTION_METRICS:
+            results = collect_metrics(results, local_dir, run_id, metrics_rows)
+        if EXTRACTION_STREAMING:
+            # Write results in batches while the remaining files are still being extracted
+            stats = stream_source_text_updates(conn, table_name, results, on_batch_written=checkpoint)
+            print(f"Streamed {stats['written_files']} extraction results in {stats['batches']} batches.")
+            record_metrics(conn, metrics_rows)
+            if stats["batches"] == 0:
+                print("No valid files found for extraction.")
+            if stats["failed_files"]:
+                raise RuntimeError(f"updating source_text in table '{table_name}' failed for {stats['failed_files']} files")
+            return
+        df_extracted_texts = pd.DataFrame(
+            [(file_name, result["text"], result["status"], result["error"]) for file_name, result in results],
+            columns=['File_name', 'Extracted Text', 'Status', 'Error']
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+    record_metrics(conn, metrics_rows)
 
-    # Step 4: Extract text from files in the local directory
-    df_extracted_texts = extract_text_from_directory(local_dir)
-    
     # Check if DataFrame is not empty
     if df_extracted_texts.empty:
         print("No valid files found for extraction.")
         return
 
-    # Step 5: Update the table with the extracted text
-    update_table_with_source_text(conn, df_extracted_texts, table_name)
+    # Update the table with the extracted text
+    if not bulk_update_table_with_source_text(conn, df_extracted_texts, table_name):
+        raise RuntimeError(f"updating source_text in table '{table_name}' failed")
+    checkpoint(df_extracted_texts['File_name'])
+
+# Main workflow function.
+# Progress is recorded in a run manifest; with resume=True an interrupted run continues where it stopped.
+def main_workflow(bucket_name, table_name, resume=False):
+    manifest = RunManifest(resume=resume)
+
+    # Step 1: Sync new or changed files from GCP bucket to the local directory
+    if manifest.stage_done("download_attachments"):
+        print("Resuming: files were already synced in this run.")
+    else:
+        stats = download_files_to_directory(bucket_name, LOCAL_DIR, sync=True)
+        if stats.get("failed_files") or stats.get("error"):
+            manifest.mark_stage("download_attachments", "failed")
+            print("Sync did not complete; rerun with --resume to continue.")
+            return
+        manifest.mark_stage("download_attachments", "done")
+
+    # Step 2: Connect to the database
+    conn = connect_to_db()
+    if not conn:
+        print("Failed to connect to the database.")
+        return
 
-    # Close the connection
-    conn.close()
+    # Step 3: Extract the text and update the table with it
+    try:
+        update_source_text(conn, table_name, LOCAL_DIR, manifest=manifest)
+    except Exception as e:
+        manifest.mark_stage(EXTRACT_STAGE, "failed")
+        print(f"Error updating source text: {e}; rerun with --resume to continue.")
+        return
+    finally:
+        # Close the connection
+        conn.close()
+    manifest.mark_stage(EXTRACT_STAGE, "done")
+    manifest.finish()
 
 # Example usage
 if __name__ == "__main__":
     table_name = 'validation'  # Replace with your actual table name
-    main_workflow(BUCKET_NAME, table_name)
\ No newline at end of file
+    # Pass --resume to continue an interrupted run instead of starting over
+    main_workflow(BUCKET_NAME, table_name, resume='--resume' in sys.argv)
\ No newline at end of file
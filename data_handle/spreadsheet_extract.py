@@ -0,0 +1,133 @@
+import csv
+import os
+
+# openpyxl and xlrd are imported by the extractors that need them, so reading a CSV loads neither
+
+# Caps applied to every spreadsheet: rows per sheet, columns per row and characters for the whole file
+SHEET_MAX_ROWS = int(os.getenv("SHEET_MAX_ROWS", 100_000))
+SHEET_MAX_COLS = int(os.getenv("SHEET_MAX_COLS", 200))
+SHEET_MAX_CHARS = int(os.getenv("SHEET_MAX_CHARS", 5_000_000))
+
+# Separator placed between the cells of a row
+CELL_DELIMITER = ", "
+
+
+class SheetTextWriter:
+    """Collects compact delimited rows sheet by sheet while enforcing the row, column and character caps.
+
+    Per-sheet statistics (rows written, whether the sheet was truncated) are kept in `sheet_stats`.
+    """
+
+    def __init__(self, max_rows=SHEET_MAX_ROWS, max_cols=SHEET_MAX_COLS, max_chars=SHEET_MAX_CHARS):
+        self.max_rows = max_rows
+        self.max_cols = max_cols
+        self.max_chars = max_chars
+        self.parts = []
+        self.chars = 0
+        self.sheet_stats = []
+        self.full = False
+
+    # Function to write the rows of one sheet; rows are any iterable of cell-value sequences
+    def write_sheet(self, name, rows):
+        lines = []
+        written = 0
+        truncated = False
+        for row in rows:
+            if self.full:
+                truncated = True
+                break
+            if written >= self.max_rows:
+                truncated = True
+                break
+            line = self.format_row(row)
+            if line is None:
+                continue
+            if self.chars + len(line) + 1 > self.max_chars:
+                self.full = True
+                truncated = True
+                break
+            lines.append(line)
+            self.chars += len(line) + 1
+            written += 1
+
+        self.sheet_stats.append({"sheet": name, "rows": written, "truncated": truncated})
+        if name is not None:
+            suffix = ", truncated" if truncated else ""
+            self.parts.append(f"Sheet: {name} ({written} rows{suffix})\n")
+        self.parts.append("\n".join(lines))
+        self.parts.append("\n\n" if name is not None else "")
+
+    # Function to render one row as delimited text; returns None for rows without any value
+    def format_row(self, row):
+        cells = [format_cell(value) for value in list(row)[:self.max_cols]]
+        while cells and cells[-1] == "":
+            cells.pop()
+        if not cells:
+            return None
+        return CELL_DELIMITER.join(cells)
+
+    def text(self):
+        return "".join(self.parts)
+
+
+# Function to render a single cell value compactly (whole floats without the trailing .0)
+def format_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+# Function to stream an .xlsx workbook row by row with openpyxl in read-only mode
+def extract_xlsx_text(file_path, writer=None):
+    import openpyxl
+
+    writer = writer or SheetTextWriter()
+    # Opened as a file object so files dispatched by content sniffing load regardless of their extension
+    with open(file_path, 'rb') as file:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            for worksheet in workbook.worksheets:
+                writer.write_sheet(worksheet.title, worksheet.iter_rows(max_col=writer.max_cols, values_only=True))
+        finally:
+            workbook.close()
+    return writer.text(), writer.sheet_stats
+
+# Function to read an .xls workbook one sheet at a time, unloading each sheet once it has been written
+def extract_xls_text(file_path, writer=None):
+    import xlrd
+
+    writer = writer or SheetTextWriter()
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        for sheet_name in workbook.sheet_names():
+            sheet = workbook.sheet_by_name(sheet_name)
+            rows = (
+                [xls_cell_value(cell, workbook.datemode) for cell in sheet.row_slice(row_index, 0, min(sheet.ncols, writer.max_cols))]
+                for row_index in range(sheet.nrows)
+            )
+            writer.write_sheet(sheet_name, rows)
+            workbook.unload_sheet(sheet_name)
+    finally:
+        workbook.release_resources()
+    return writer.text(), writer.sheet_stats
+
+# Function to convert an xlrd cell to a Python value (dates become datetimes)
+def xls_cell_value(cell, datemode):
+    import xlrd
+
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        try:
+            return xlrd.xldate_as_datetime(cell.value, datemode)
+        except Exception:
+            return cell.value
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+        return None
+    return cell.value
+
+# Function to stream a .csv file through csv.reader
+def extract_csv_text(file_path, writer=None):
+    writer = writer or SheetTextWriter()
+    with open(file_path, 'r', newline='', encoding='utf-8') as file:
+        writer.write_sheet(None, csv.reader(file))
+    return writer.text(), writer.sheet_stats
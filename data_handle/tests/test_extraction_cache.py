@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+# The data_handle scripts import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction_cache import declare_extractor_dependencies, extractor_version
+import source_text_extract
+
+
+class ExtractorVersionTest(unittest.TestCase):
+
+    def test_output_setting_changes_version(self):
+        with mock.patch.dict(os.environ, {"JSON_OUTPUT_MODE": "compact"}):
+            compact = extractor_version(source_text_extract.extract_text_from_json)
+        with mock.patch.dict(os.environ, {"JSON_OUTPUT_MODE": "flatten"}):
+            flatten = extractor_version(source_text_extract.extract_text_from_json)
+        self.assertNotEqual(compact, flatten)
+
+    def test_delegate_module_is_part_of_version(self):
+        def extract(file_path):
+            return ""
+        own = extractor_version(extract)
+        declare_extractor_dependencies(extract, ["json_extract"])
+        self.assertNotEqual(extractor_version(extract), own)
+
+    def test_wrapped_extractor_follows_its_dependency(self):
+        with mock.patch.dict(os.environ, {"TRANSCRIPTION_BACKEND": "google"}):
+            google = extractor_version(source_text_extract.extract_text_from_audio1)
+        with mock.patch.dict(os.environ, {"TRANSCRIPTION_BACKEND": "stub"}):
+            stub = extractor_version(source_text_extract.extract_text_from_audio1)
+        self.assertNotEqual(google, stub)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# The data_handle scripts import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor_registry import sniff_mime_type
+
+
+class SniffMimeTypeTest(unittest.TestCase):
+
+    def sniff(self, content):
+        with tempfile.NamedTemporaryFile(delete=False) as file:
+            file.write(content)
+        try:
+            return sniff_mime_type(file.name)
+        finally:
+            os.remove(file.name)
+
+    def test_mpeg_frame_is_audio(self):
+        # MPEG-1 Layer III, 128 kbit/s, 44.1 kHz
+        self.assertEqual(self.sniff(b"\xff\xfb\x90\x64" + b"\x00" * 12), "audio/mpeg")
+        self.assertEqual(self.sniff(b"ID3\x03\x00" + b"\x00" * 11), "audio/mpeg")
+
+    def test_utf16_text_is_not_audio(self):
+        self.assertIsNone(self.sniff("name,value\n1,2\n".encode("utf-16")))
+        self.assertIsNone(self.sniff(b"\xfe\xff" + "text".encode("utf-16-be")))
+        self.assertIsNone(self.sniff(b"\xef\xbb\xbfplain text"))
+
+    def test_invalid_mpeg_header_is_not_audio(self):
+        # Frame sync followed by a reserved version and layer
+        self.assertIsNone(self.sniff(b"\xff\xe8\x90\x64" + b"\x00" * 12))
+        # Frame sync followed by the invalid bitrate index
+        self.assertIsNone(self.sniff(b"\xff\xfb\xf0\x64" + b"\x00" * 12))
+
+
+if __name__ == "__main__":
+    unittest.main()
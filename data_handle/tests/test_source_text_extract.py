@@ -0,0 +1,54 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# The data_handle scripts import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from source_text_extract import extract_file_result
+
+
+class ExtractFileResultTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, file_name, content):
+        path = os.path.join(self.tmp.name, file_name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def test_text_starting_with_error_is_kept(self):
+        content = "Error codes observed during the run:\nE1 disk full\n"
+        result = extract_file_result(self.write("log.txt", content))
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(result["text"], content)
+        self.assertIsNone(result["error"])
+
+    def test_csv_with_error_header_is_kept(self):
+        result = extract_file_result(self.write("codes.csv", "Error code,Meaning\nE1,disk full\n"))
+        self.assertEqual(result["status"], "ok")
+        self.assertIn("Error code", result["text"])
+
+    def test_unreadable_file_is_an_error(self):
+        path = os.path.join(self.tmp.name, "broken.txt")
+        with open(path, 'wb') as file:
+            file.write(b"\xff\xfe\xfa not utf-8")
+        result = extract_file_result(path)
+        self.assertEqual(result["status"], "error")
+        self.assertIsNone(result["text"])
+        self.assertTrue(result["error"].startswith("Error reading TXT file"))
+
+    def test_unknown_extension_is_unsupported(self):
+        result = extract_file_result(self.write("notes.unknownext", "plain words"))
+        self.assertEqual(result["status"], "unsupported")
+        self.assertIsNone(result["text"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import unittest
+
+# The data_handle scripts import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gcs_utils import LocalBucket
+from source_text_extract import SYNC_MANIFEST_NAME, list_extraction_files, sync_files_to_directory
+
+
+class SyncFilesToDirectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bucket_dir = os.path.join(self.tmp.name, "bucket")
+        self.local_dir = os.path.join(self.tmp.name, "local")
+        os.makedirs(self.bucket_dir)
+        for file_name, content in [("a.txt", "first"), ("b.csv", "x,y\n1,2\n")]:
+            with open(os.path.join(self.bucket_dir, file_name), 'w') as file:
+                file.write(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self):
+        return sync_files_to_directory(self.bucket_dir, self.local_dir, max_workers=2, bucket=LocalBucket(self.bucket_dir))
+
+    def test_second_sync_skips_unchanged_files(self):
+        first = self.sync()
+        self.assertNotIn("error", first)
+        self.assertEqual(first["fetched_files"], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.local_dir, SYNC_MANIFEST_NAME)))
+        self.assertFalse(os.path.exists(os.path.join(self.local_dir, SYNC_MANIFEST_NAME + ".tmp")))
+
+        second = self.sync()
+        self.assertNotIn("error", second)
+        self.assertEqual(second["fetched_files"], 0)
+        self.assertEqual(second["skipped_files"], 2)
+
+    def test_extraction_skips_sync_bookkeeping_files(self):
+        self.sync()
+        open(os.path.join(self.local_dir, SYNC_MANIFEST_NAME + ".tmp"), 'w').close()
+        open(os.path.join(self.local_dir, "c.pdf.part"), 'w').close()
+        self.assertEqual(sorted(list_extraction_files(self.local_dir)), ["a.txt", "b.csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()